@@ -1,13 +1,34 @@
 import streamlit as st
-from PIL import Image
 import pandas as pd
 import re
-import unicodedata
 import time
-import base64
+import hashlib
 import os
 import io
-import requests
+import importlib.util
+import logging
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from datos import (
+    cargar_hojas, construir_cubo_restricciones, conteo_por_tipo, descargar_excel, filtrar_proyecto,
+    indexar_por_proyecto, kpis_restricciones, normalizar_texto, preparar_hojas, quitar_tildes, version_datos
+)
+from consultas import CacheLRU, construir_parser
+from predictor import (
+    COLUMNAS_ENTRADA, OPCIONES_CNC, OPCIONES_PRIORIDAD, OPCIONES_TIPO_CONTRATO,
+    COLUMNA_RIESGO, cargar_artefactos, columnas_riesgo_faltantes, leer_lote, puntuar_lote, puntuar_restricciones,
+    rutas_artefactos,
+)
+from perfil import medir_seccion, registrar_seccion
+from registros import AlmacenRegistros, ColaEscritura, nuevo_registro
+from sincronizacion import SincronizadorHoja, abrir_hoja, configuracion_hoja
+from fotos import guardar_foto, ruta_miniatura
+from voz import DIR_MODELOS_WHISPER, TranscriptorVoz, ruta_modelo
+from estaticos import (
+    URL_STATIC, data_uri, leer_estatico, optimizar_imagen, publicar_imagen, url_estatico, version_estatico
+)
 
 # ==============================
 # CONFIGURACIÓN INICIAL CON OPCIONES DESHABILITADAS
@@ -24,68 +45,8 @@ st.set_page_config(
     }
 )
 
-# ==============================
-# CSS ADICIONAL PARA OCULTAR ELEMENTOS DE STREAMLIT
-# ==============================
-st.markdown("""
-<style>
-    /* Ocultar completamente el menú de hamburguesa */
-    #MainMenu {visibility: hidden !important;}
-    
-    /* Ocultar el botón de deploy/share de Streamlit */
-    .stAppDeployButton {display: none !important;}
-    
-    /* Ocultar el footer por defecto de Streamlit */
-    footer {visibility: hidden !important;}
-    
-    /* Ocultar cualquier elemento de share o GitHub */
-    .st-emotion-cache-1dj0hjr {display: none !important;}
-    [data-testid="baseButton-header"] {display: none !important;}
-    [data-testid="stToolbar"] {display: none !important;}
-    .stApp [data-testid="stHeader"] {display: none !important;}
-    
-    /* Ocultar el botón de menú hamburguesa */
-    [data-testid="collapsedControl"] {display: none !important;}
-    
-    /* Asegurar que no haya espacios vacíos por elementos ocultos */
-    .stApp header {display: none !important;}
-    
-    /* PIE DE PÁGATA FIJO PERSONALIZADO */
-    .custom-footer {
-        position: fixed !important;
-        bottom: 0 !important;
-        left: 0 !important;
-        width: 100% !important;
-        background-color: #0D3A5F !important;
-        color: white !important;
-        text-align: center !important;
-        padding: 8px 0 !important;
-        font-size: 12px !important;
-        font-family: "Roboto", sans-serif !important;
-        z-index: 9999 !important;
-    }
-</style>
-""", unsafe_allow_html=True)
-
-# ==============================
-# IMPORTACIONES ADICIONALES PARA NN
-# ==============================
-NN_AVAILABLE = False
-try:
-    import joblib
-    import numpy as np
-    from sklearn.neural_network import MLPClassifier 
-    from sklearn.preprocessing import StandardScaler
-    NN_AVAILABLE = True
-except ImportError:
-    pass
-
-# Intentamos importar plotly
-try:
-    import plotly.express as px
-    PLOTLY_AVAILABLE = True
-except ImportError:
-    PLOTLY_AVAILABLE = False
+# plotly se importa en las funciones que dibujan gráficos; aquí solo se comprueba que esté instalado
+PLOTLY_AVAILABLE = importlib.util.find_spec("plotly") is not None
 
 # -----------------------------
 # PALETA DE COLORES (UX / BI)
@@ -97,554 +58,168 @@ PALETTE = {
     "bg": "#ffffff"
 }
 
-# -----------------------------
-# CSS GLOBAL - ¡Agregando el estilo para el botón de 'Predicción' y Modal!
-# -----------------------------
-st.markdown(f"""
-<style>
-/* Variables de Estilo */
-:root {{
-    --mar-primary: {PALETTE['primary']};
-    --mar-accent: {PALETTE['accent']};
-    --mar-muted: {PALETTE['muted']};
-    --mar-bg: {PALETTE['bg']};
-    --card-radius: 12px;
-    --card-padding: 20px;
-    --title-size: 38px;
-    --shadow-light: 0 4px 12px rgba(21,72,114,0.06);
-    --shadow-hover: 0 6px 16px rgba(21,72,114,0.10);
-}}
-
-/* Aplicación Principal y Fuente */
-.stApp {{
-    background-color: var(--mar-bg);
-    color: #1b2635;
-    font-family: 'Roboto', sans-serif;
-}}
-
-/* Títulos y Subtítulos */
-.title {{
-    color: var(--mar-primary);
-    font-size: var(--title-size);
-    font-weight: 900;
-    margin: 0;
-    line-height: 1.1;
-    font-family: 'Roboto Slab', serif;
-}}
-.subtitle {{
-    color: #34495e;
-    font-size: 17px;
-    margin: 6px 0 0 0;
-    font-weight: 300;
-}}
-
-/* Contenedores y Tarjetas */
-.mar-card {{
-    background-color: white;
-    padding: var(--card-padding);
-    border-radius: var(--card-radius);
-    box-shadow: var(--shadow-light);
-    transition: box-shadow 0.3s ease;
-    margin-bottom: 25px;
-}}
-.mar-card:hover {{
-    box-shadow: var(--shadow-hover);
-}}
-
-/* Input de Texto y Controles */
-.stTextInput>div>div>input {{
-    background-color: white;
-    border: 1px solid rgba(21,72,114,0.25);
-    border-radius: 8px;
-    padding: 10px 15px;
-    font-size: 15px;
-    height: 44px;
-}}
-.stTextInput>div>div>input:focus {{
-    border-color: var(--mar-accent);
-    box-shadow: 0 0 0 3px rgba(93,192,220,0.3);
-}}
-.stTextInput>div>div>input::placeholder {{
-    color: rgba(0, 0, 0, 0.4);
-    font-style: italic;
-}}
-
-/* Estilo para el botón BUSCAR */
-.stButton>button[key="btn_buscar"] {{
-    background-color: var(--mar-primary) !important; 
-    color: white !important;
-    border: 1px solid var(--mar-primary) !important;
-    border-radius: 8px;
-    padding: 0 20px;
-    font-weight: 600;
-    height: 44px; 
-    transition: background-color 0.2s ease, border-color 0.2s ease;
-    margin-top: 0px; 
-}}
-
-.stButton>button[key="btn_buscar"]:hover {{
-    background-color: var(--mar-muted) !important;
-    color: white !important;
-    border: 1px solid var(--mar-muted) !important;
-}}
-
-/* Estilo para el botón SECUNDARIO (VOZ) */
-.stButton>button[key="voz"] {{
-    background-color: var(--mar-accent) !important;
-    color: var(--mar-primary) !important;
-    border: 1px solid var(--mar-accent) !important;
-    border-radius: 8px !important;
-    padding: 0 12px !important;
-    font-weight: 600 !important;
-    height: 44px !important;
-    transition: background-color 0.2s ease, color 0.2s ease;
-    margin-top: 0px; 
-}}
-.stButton>button[key="voz"]:hover {{
-    background-color: #3aa6c1 !important;
-    color: white !important;
-    border: 1px solid #3aa6c1 !important;
-}}
-
-/* NUEVO: Estilo para el botón de PREDICCIÓN (Arriba a la derecha) */
-.stButton>button[key="btn_prediccion"] {{
-    background-color: #f7a835 !important;
-    color: white !important;
-    border: 1px solid #f7a835 !important;
-    border-radius: 8px !important;
-    padding: 0 20px !important;
-    font-weight: 600 !important;
-    height: 44px !important;
-    transition: background-color 0.2s ease, color 0.2s ease;
-    margin-top: 0px; 
-}}
-.stButton>button[key="btn_prediccion"]:hover {{
-    background-color: #e69524 !important;
-    border: 1px solid #e69524 !important;
-}}
-
-/* Estilo para el botón de Devolver (en la vista de Predicción) */
-.stButton>button[key="btn_devolver"] {{
-    background-color: #f0f2f6 !important;
-    color: #34495e !important;
-    border: 1px solid #dcdfe6 !important;
-    border-radius: 8px !important;
-    padding: 0 15px !important;
-    font-weight: 600 !important;
-    height: 44px !important;
-    transition: background-color 0.2s ease, color 0.2s ease;
-    margin-top: 0px; 
-}}
-.stButton>button[key="btn_devolver"]:hover {{
-    background-color: #e9ecef !important;
-}}
-
-/* NUEVO: Estilo para el botón de VENTANA EMERGENTE */
-.stButton>button[key="btn_modal"] {{
-    background-color: #28a745 !important;
-    color: white !important;
-    border: 1px solid #28a745 !important;
-    border-radius: 8px !important;
-    padding: 0 20px !important;
-    font-weight: 600 !important;
-    height: 44px !important;
-    transition: background-color 0.2s ease, color 0.2s ease;
-    margin-top: 0px; 
-}}
-.stButton>button[key="btn_modal"]:hover {{
-    background-color: #218838 !important;
-    border: 1px solid #218838 !important;
-}}
-
-/* NUEVO: Estilo para el botón de NUEVA NOVEDAD */
-.stButton>button[key="btn_nueva_novedad"] {{
-    background-color: #17a2b8 !important;
-    color: white !important;
-    border: 1px solid #17a2b8 !important;
-    border-radius: 8px !important;
-    padding: 0 20px !important;
-    font-weight: 600 !important;
-    height: 44px !important;
-    transition: background-color 0.2s ease, color 0.2s ease;
-    margin-top: 0px; 
-}}
-.stButton>button[key="btn_nueva_novedad"]:hover {{
-    background-color: #138496 !important;
-    border: 1px solid #138496 !important;
-}}
-
-/* NUEVO: Estilo para el botón de VOLVER AL CHAT */
-.stButton>button[key="btn_volver_chat"] {{
-    background-color: #17a2b8 !important;
-    color: white !important;
-    border: 1px solid #17a2b8 !important;
-    border-radius: 8px !important;
-    padding: 0 20px !important;
-    font-weight: 600 !important;
-    height: 45px !important;
-    font-size: 16px !important;
-}}
-
-.stButton>button[key="btn_volver_chat"]:hover {{
-    background-color: #138496 !important;
-    border: 1px solid #138496 !important;
-}}
-
-/* Estilo para la ficha de conteo */
-.metric-card {{
-    background-color: #f0f2f6;
-    padding: 15px;
-    border-radius: 8px;
-    text-align: center;
-    box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-}}
-.metric-value {{
-    font-size: 36px;
-    font-weight: 700;
-    color: var(--mar-primary);
-    line-height: 1;
-}}
-.metric-label {{
-    font-size: 14px;
-    color: #6b7280;
-    margin-top: 5px;
-}}
-
-/* Sidebar */
-[data-testid="stSidebar"] {{
-    background-color: white;
-    padding: 20px;
-    box-shadow: var(--shadow-light);
-    border-right: 1px solid #e0e0e0;
-}}
-
-/* Estilo para st.info, st.success, etc. */
-.stAlert > div {{
-    border-radius: 8px;
-    padding: 12px 15px;
-    font-size: 15px;
-}}
-
-/* NUEVO: Estilos para la ventana modal */
-.modal {{
-    display: none;
-    position: fixed;
-    z-index: 1000;
-    left: 0;
-    top: 0;
-    width: 100%;
-    height: 100%;
-    background-color: rgba(0,0,0,0.5);
-    backdrop-filter: blur(5px);
-}}
-
-.modal-content {{
-    background-color: white;
-    margin: 5% auto;
-    padding: 0;
-    border-radius: 12px;
-    box-shadow: 0 10px 30px rgba(0,0,0,0.3);
-    width: 90%;
-    max-width: 700px;
-    max-height: 85vh;
-    overflow-y: auto;
-    position: relative;
-    animation: modalSlideIn 0.3s ease-out;
-}}
-
-@keyframes modalSlideIn {{
-    from {{
-        opacity: 0;
-        transform: translateY(-50px);
-    }}
-    to {{
-        opacity: 1;
-        transform: translateY(0);
-    }}
-}}
-
-.close {{
-    color: #aaa;
-    float: right;
-    font-size: 28px;
-    font-weight: bold;
-    cursor: pointer;
-    position: absolute;
-    right: 20px;
-    top: 15px;
-    z-index: 1001;
-    transition: color 0.2s ease;
-}}
-
-.close:hover {{
-    color: #333;
-}}
-
-.modal-header {{
-    background-color: var(--mar-primary);
-    color: white;
-    padding: 25px 30px;
-    border-radius: 12px 12px 0 0;
-}}
-
-.modal-title {{
-    color: white;
-    font-size: 24px;
-    font-weight: 700;
-    margin: 0;
-    display: flex;
-    align-items: center;
-    gap: 10px;
-}}
-
-.modal-body {{
-    padding: 30px;
-}}
-
-.modal-footer {{
-    background-color: #f8f9fa;
-    padding: 20px 30px;
-    border-radius: 0 0 12px 12px;
-    display: flex;
-    justify-content: flex-end;
-    gap: 15px;
-    border-top: 1px solid #e9ecef;
-}}
-
-/* Estilo para botones dentro del modal */
-.stButton>button[key="btn_guardar"] {{
-    background-color: #28a745 !important;
-    color: white !important;
-    border: 1px solid #28a745 !important;
-    border-radius: 8px !important;
-    padding: 0 25px !important;
-    font-weight: 600 !important;
-    height: 45px !important;
-    font-size: 16px !important;
-}}
-
-.stButton>button[key="btn_guardar"]:hover {{
-    background-color: #218838 !important;
-    border: 1px solid #218838 !important;
-}}
-
-.stButton>button[key="btn_cerrar_modal"] {{
-    background-color: #6c757d !important;
-    color: white !important;
-    border: 1px solid #6c757d !important;
-    border-radius: 8px !important;
-    padding: 0 25px !important;
-    font-weight: 600 !important;
-    height: 45px !important;
-    font-size: 16px !important;
-}}
-
-.stButton>button[key="btn_cerrar_modal"]:hover {{
-    background-color: #5a6268 !important;
-    border: 1px solid #5a6268 !important;
-}}
-
-/* Ocultar el contenido principal cuando el modal está abierto */
-.modal-open .main-content {{
-    filter: blur(3px);
-    pointer-events: none;
-    user-select: none;
-}}
-
-/* Mejoras para los campos del formulario dentro del modal */
-.modal-body .stTextInput>div>div>input {{
-    border: 1px solid #ddd;
-    border-radius: 6px;
-    padding: 12px 15px;
-    font-size: 16px;
-}}
-
-.modal-body .stTextArea>div>textarea {{
-    border: 1px solid #ddd;
-    border-radius: 6px;
-    padding: 12px 15px;
-    font-size: 16px;
-}}
-
-.modal-body .stSelectbox>div>div {{
-    border: 1px solid #ddd;
-    border-radius: 6px;
-}}
-
-.modal-body .stDateInput>div>div>input {{
-    border: 1px solid #ddd;
-    border-radius: 6px;
-    padding: 12px 15px;
-    font-size: 16px;
-}}
-
-/* Estilo para la ficha de información */
-.info-card {{
-    background-color: #f8f9fa;
-    border-left: 4px solid var(--mar-primary);
-    padding: 15px;
-    border-radius: 6px;
-    margin-top: 15px;
-}}
-.info-title {{
-    font-weight: 600;
-    color: var(--mar-primary);
-    margin-bottom: 8px;
-}}
-.info-item {{
-    margin-bottom: 4px;
-    font-size: 14px;
-}}
-
-/* Estilo para botones de urgencia */
-.urgencia-baja {{
-    background-color: #28a745 !important;
-    color: white !important;
-    border: 1px solid #28a745 !important;
-}}
-.urgencia-media {{
-    background-color: #ffc107 !important;
-    color: black !important;
-    border: 1px solid #ffc107 !important;
-}}
-.urgencia-alta {{
-    background-color: #dc3545 !important;
-    color: white !important;
-    border: 1px solid #dc3545 !important;
-}}
-
-/* Estilo para botón de cámara */
-.stButton>button[key="btn_camara"] {{
-    background-color: #6f42c1 !important;
-    color: white !important;
-    border: 1px solid #6f42c1 !important;
-    border-radius: 8px !important;
-    padding: 0 20px !important;
-    font-weight: 600 !important;
-    height: 44px !important;
-    transition: background-color 0.2s ease, color 0.2s ease;
-    margin-top: 0px; 
-}}
-.stButton>button[key="btn_camara"]:hover {{
-    background-color: #5a2d91 !important;
-    border: 1px solid #5a2d91 !important;
-}}
-
-/* Estilo para vista previa de imagen */
-.image-preview {{
-    max-width: 100%;
-    max-height: 200px;
-    border-radius: 8px;
-    border: 2px dashed #ddd;
-    margin-top: 10px;
-}}
-
-</style>
-""", unsafe_allow_html=True)
-
-# -------------------- FANTASMAS HALLOWEEN (derecha → arriba/abajo) + CALABAZAS (izquierda con rebote) --------------------
-st.markdown("""
-<style>
-@keyframes floatDown {
-    0% { top: -10%; }
-    100% { top: 100%; }
-}
-
-@keyframes floatY {
-    0% { transform: translateY(0); }
-    50% { transform: translateY(10px); }
-    100% { transform: translateY(0); }
-}
-</style>
-
-<div style="position:fixed; top:0%; right:5%; font-size:30px; opacity:0.8; animation:floatDown 15s linear infinite; z-index:9999;">❄️</div>
-<div style="position:fixed; top:10%; right:7%; font-size:28px; opacity:0.8; animation:floatDown 18s linear infinite; z-index:9999;">❄️</div>
-<div style="position:fixed; top:20%; right:6%; font-size:25px; opacity:0.8; animation:floatDown 16s linear infinite; z-index:9999;">❄️</div>
-<div style="position:fixed; top:25%; right:8%; font-size:20px; opacity:0.8; animation:floatDown 15s linear infinite; z-index:9999;">❄️</div>
-<div style="position:fixed; top:10%; right:5%; font-size:28px; opacity:0.8; animation:floatDown 13s linear infinite; z-index:9999;">❄️</div>
-<div style="position:fixed; top:20%; right:7%; font-size:25px; opacity:0.8; animation:floatDown 15s linear infinite; z-index:9999;">❄️</div>
-<div style="position:fixed; top:25%; right:9%; font-size:20px; opacity:0.8; animation:floatDown 11s linear infinite; z-index:9999;">❄️</div>
-
-<div style="position:fixed; bottom:3.7%; left:7%; font-size:27px; opacity:1; animation:floatY 3s ease-in-out infinite; z-index:9999;">🦌</div>
-<div style="position:fixed; bottom:3.7%; left:9%; font-size:27px; opacity:1; animation:floatY 2.8s ease-in-out infinite; z-index:9999;">🦌</div>
-<div style="position:fixed; bottom:3.7%; left:11%; font-size:29px; opacity:1; animation:floatY 3.2s ease-in-out infinite; z-index:9999;">🦌</div>
-
-<div style="position:fixed; bottom:3%; left:47.5%; font-size:40px; opacity:1; animation:floatY 0s ease-in-out infinite; z-index:9999;">🎄</div>
-<div style="position:fixed; bottom:3.5%; left:49.5%; font-size:20px; opacity:1; animation:floatY 0s ease-in-out infinite; z-index:9999;">🎁</div>
-<div style="position:fixed; bottom:3.5%; left:50.5%; font-size:15px; opacity:1; animation:floatY 0s ease-in-out infinite; z-index:9999;">🎁</div>
+# ==============================
+# ESTILOS Y DECORACIONES (static/estilos.css)
+# ==============================
+HOJA_ESTILOS = "estilos.css"
 
+# Nieve, renos, árbol y regalos; posición y animación viven en la hoja de estilos
+DECORACIONES_HTML = (
+    '<div class="mar-decoraciones" aria-hidden="true">'
+    + "<i>❄️</i>" * 7 + "<i>🦌</i>" * 3 + "<i>🎄</i>" + "<i>🎁</i>" * 2
+    + '</div>'
+)
 
+@st.cache_resource(max_entries=4)
+def hoja_de_estilos(version):
+    """Contenido del <style> que se emite en cada rerun.
+
+    Con el servido estático activo es solo un @import a la URL con huella del
+    archivo, que el navegador descarga una vez y guarda en caché (el @import
+    necesita que se sirva como text/css: Streamlit >= 1.65, fijado en
+    requirements.txt); si no, se incrusta la hoja completa. ``version`` (fecha de modificación del archivo)
+    forma parte de la clave, así que editar la hoja renueva la huella.
+    """
+    if st.get_option("server.enableStaticServing"):
+        return f'@import url("{url_estatico(HOJA_ESTILOS)}");'
+    return leer_estatico(HOJA_ESTILOS)
+
+# Alto en px de las imágenes publicadas: el doble del alto mostrado, para pantallas de alta densidad
+LOGO_ALTO_PX = 240
+SPLASH_ALTO_PX = 360
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def src_imagen(clave, prefijo, alto, _leer):
+    """``src`` de un <img>: versión reescalada y recomprimida, generada una vez por ``clave``.
+
+    Con el servido estático activo es una URL inmutable (lleva la huella del
+    archivo); si no, un data URI de la versión optimizada.
+    """
+    nombre, optimizada = publicar_imagen(_leer(), prefijo, alto)
+    if st.get_option("server.enableStaticServing"):
+        return f"{URL_STATIC}/{nombre}"
+    return data_uri(optimizada, nombre)
+
+inicio_seccion = time.perf_counter()
+st.markdown(
+    f"<style>{hoja_de_estilos(version_estatico(HOJA_ESTILOS))}"
+    f":root{{--mar-primary:{PALETTE['primary']};--mar-accent:{PALETTE['accent']};"
+    f"--mar-muted:{PALETTE['muted']};--mar-bg:{PALETTE['bg']};}}</style>",
+    unsafe_allow_html=True
+)
+registrar_seccion("Inyección de CSS", time.perf_counter() - inicio_seccion)
 
-""", unsafe_allow_html=True)
+inicio_seccion = time.perf_counter()
+st.markdown(DECORACIONES_HTML, unsafe_allow_html=True)
+registrar_seccion("Decoraciones", time.perf_counter() - inicio_seccion)
 
 # -----------------------------
-# CARGA DE MODELO DE NN (MLP)
+# CARGA DIFERIDA DE MODELO DE NN (MLP)
 # -----------------------------
-MODELO_NN = None
-SCALER_NN = None
-FEATURES_NN = None
-MODEL_PATH = os.path.join("assets", "mlp_contratos.joblib")
-SCALER_PATH = os.path.join("assets", "scaler_contratos.joblib")
-FEATURES_PATH = os.path.join("assets", "mlp_features.joblib")
-
-if NN_AVAILABLE:
-    if os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH) and os.path.exists(FEATURES_PATH):
-        try:
-            @st.cache_resource
-            def load_mlp_artifacts():
-                model = joblib.load(MODEL_PATH)
-                scaler = joblib.load(SCALER_PATH)
-                features = joblib.load(FEATURES_PATH)
-                return model, scaler, features
-            
-            MODELO_NN, SCALER_NN, FEATURES_NN = load_mlp_artifacts()
-        except Exception as e:
-            st.sidebar.error(f"Error al cargar el MLP o artefactos: {e}")
-            MODELO_NN, SCALER_NN, FEATURES_NN = None, None, None
-    else:
-        st.sidebar.warning(f"Faltan archivos del MLP en la carpeta assets. El predictor no estará disponible.")
+# Rejilla de probabilidades precalculada al cargar el modelo (consulta directa + mapa de escenarios)
+USAR_TABLA_PREDICCION = True
+
+# Solo manifiesto y existencia de archivos: sklearn/joblib se importan al entrar en la previsión
+RUTAS_NN = rutas_artefactos()
+if RUTAS_NN is None:
+    st.sidebar.warning(f"Faltan archivos del MLP en la carpeta assets. El predictor no estará disponible.")
+
+@st.cache_resource(show_spinner=False)
+def load_mlp_artifacts():
+    with medir_seccion("Carga del MLP"):
+        mlp = cargar_artefactos(RUTAS_NN, con_tabla_prediccion=USAR_TABLA_PREDICCION)
+    # Solo aquí, que se ejecuta una vez por proceso: no se repite en cada rerun
+    for aviso in mlp.avisos:
+        logging.getLogger(__name__).warning(aviso)
+    return mlp
+
+def obtener_mlp():
+    """Artefactos del MLP (cargados una vez por proceso, en el primer uso) o None si no están disponibles"""
+    if RUTAS_NN is None:
+        return None
+    try:
+        mlp = load_mlp_artifacts()
+    except Exception as e:
+        st.sidebar.error(f"Error al cargar el MLP o artefactos: {e}")
+        return None
+    return mlp
 
 # -----------------------------
 # CONFIGURACIÓN DEL ARCHIVO EXCEL DESDE GITHUB
 # -----------------------------
 GITHUB_EXCEL_URL = "https://raw.githubusercontent.com/bautistapulgarin/MarAssistant/main/data/control_obra.xlsx"
 
-@st.cache_data(ttl=3600)
+@st.cache_resource(max_entries=2, show_spinner=False)
+def preparar_datos(version, _contenido):
+    """Lee y normaliza las hojas una sola vez por versión de los datos"""
+    with medir_seccion("Lectura de hojas (snapshot/xlsx)"):
+        hojas, _ = cargar_hojas(_contenido, version=version)
+    with medir_seccion("Normalización"):
+        hojas, projects_map = preparar_hojas(hojas)
+    with medir_seccion("Índices, cubo e intérprete"):
+        return {
+            **hojas,
+            'projects_map': projects_map,
+            'interpretar_pregunta': construir_parser(projects_map),
+            'indices_proyecto': indexar_por_proyecto(hojas),
+            'cubo_restricciones': construir_cubo_restricciones(hojas['restricciones']),
+            'version': version
+        }
+
+@st.cache_resource(ttl=3600)
 def load_excel_from_github():
-    """Carga el archivo Excel desde GitHub"""
+    """Carga el archivo Excel desde GitHub (revalidando la copia en disco)"""
     try:
-        response = requests.get(GITHUB_EXCEL_URL)
-        response.raise_for_status()
+        with medir_seccion("Descarga del Excel"):
+            contenido, origen = descargar_excel(GITHUB_EXCEL_URL)
         
-        # Leer el contenido del Excel
-        excel_content = io.BytesIO(response.content)
-        
-        # Cargar todas las hojas necesarias
-        df_avance = pd.read_excel(excel_content, sheet_name="Avance")
-        excel_content.seek(0)
-        df_responsables = pd.read_excel(excel_content, sheet_name="Responsables")
-        excel_content.seek(0)
-        df_restricciones = pd.read_excel(excel_content, sheet_name="Restricciones")
-        excel_content.seek(0)
-        df_sostenibilidad = pd.read_excel(excel_content, sheet_name="Sostenibilidad")
-        excel_content.seek(0)
-        df_avance_diseno = pd.read_excel(excel_content, sheet_name="AvanceDiseño")
-        excel_content.seek(0)
-        df_inventario_diseno = pd.read_excel(excel_content, sheet_name="InventarioDiseño")
+        # Snapshot columnar y normalización, compartidos por versión del libro
+        datos = preparar_datos(version_datos(contenido), contenido)
         
         return {
-            'avance': df_avance,
-            'responsables': df_responsables,
-            'restricciones': df_restricciones,
-            'sostenibilidad': df_sostenibilidad,
-            'avance_diseno': df_avance_diseno,
-            'inventario_diseno': df_inventario_diseno,
+            **datos,
+            'origen': origen,
             'success': True
         }
     except Exception as e:
         st.error(f"Error al cargar el archivo Excel desde GitHub: {e}")
         return {'success': False, 'error': str(e)}
 
+# -----------------------------
+# RIESGO DE LAS RESTRICCIONES DE CONTRATO (SEGUNDO PLANO)
+# -----------------------------
+@st.cache_resource
+def obtener_ejecutor_riesgo():
+    """Un solo hilo para puntuar restricciones fuera del ciclo de cada consulta"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="riesgo_restricciones")
+
+def calcular_riesgo_restricciones(mlp, df):
+    return (puntuar_restricciones(df, mlp.modelo, mlp.scaler, mlp.features) * 100).round(1)
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def riesgo_restricciones(version, _df, _mlp):
+    """Lanza, una vez por versión de los datos, la puntuación de las restricciones de contrato.
+
+    El MLP llega ya cargado desde el hilo del script (donde sus errores se muestran);
+    el hilo de fondo solo puntúa.
+    """
+    return obtener_ejecutor_riesgo().submit(calcular_riesgo_restricciones, _mlp, _df)
+
+def riesgo_disponible(futuro):
+    """Serie de probabilidad de cumplimiento (%) si el cálculo ya terminó; si no, None.
+
+    Si el cálculo falló se muestra el error y se descarta el Future en caché para
+    reintentarlo en el siguiente rerun.
+    """
+    if futuro is None or not futuro.done():
+        return None
+    error = futuro.exception()
+    if error is not None:
+        st.error(f"No se pudo calcular la probabilidad de cumplimiento: {error}")
+        riesgo_restricciones.clear()
+        return None
+    return futuro.result()
+
 # -----------------------------
 # OPCIONES PARA LOS CAMPOS DEL FORMULARIO
 # -----------------------------
@@ -827,6 +402,42 @@ def mostrar_tabla_resumen_restriccion(datos_restriccion):
     
     return df_resumen
 
+# -----------------------------
+# GUARDADO EN SEGUNDO PLANO Y NOTIFICACIONES
+# -----------------------------
+@st.cache_resource
+def obtener_almacen_registros():
+    """Base SQLite local con los registros y novedades de todas las sesiones"""
+    return AlmacenRegistros()
+
+@st.cache_resource
+def obtener_sincronizador():
+    """Envío a Google Sheets en segundo plano, o None si no está configurado (ver sincronizacion.py)"""
+    configuracion = configuracion_hoja()
+    if configuracion is None:
+        return None
+    return SincronizadorHoja(obtener_almacen_registros(), lambda: abrir_hoja(**configuracion))
+
+@st.cache_resource
+def obtener_cola_registros():
+    """Cola de escritura común a todas las sesiones; inserta por lotes fuera del rerun"""
+    almacen = obtener_almacen_registros()
+    sincronizador = obtener_sincronizador()
+    
+    def destino(lote):
+        almacen.insertar_lote(lote)
+        if sincronizador is not None:
+            sincronizador.despertar()
+    return ColaEscritura(destino)
+
+def notificar(mensaje, icono="✅"):
+    """Deja un aviso para mostrarlo como toast en el siguiente rerun (sobrevive a st.rerun)"""
+    st.session_state.setdefault('notificaciones', []).append((mensaje, icono))
+
+def mostrar_notificaciones():
+    for mensaje, icono in st.session_state.pop('notificaciones', []):
+        st.toast(mensaje, icon=icono)
+
 # -----------------------------
 # FUNCIONES PARA LA VENTANA MODAL
 # -----------------------------
@@ -852,7 +463,7 @@ def cerrar_modal():
     else:  # novedad
         campos_a_limpiar = [
             'modal_novedad_proyecto', 'modal_tipo_observacion', 
-            'modal_urgencia', 'modal_descripcion_novedad', 'foto_capturada'
+            'modal_urgencia', 'modal_descripcion_novedad', 'foto_huella'
         ]
     
     for campo in campos_a_limpiar:
@@ -892,14 +503,14 @@ def guardar_formulario():
         'detalle_opcional': detalle_opcional,
         'resumen': resumen  # Agregar el resumen
     }
+    # La escritura la hace el hilo de la cola; aquí solo se encola
+    obtener_cola_registros().encolar(nuevo_registro('registro', st.session_state.datos_guardados))
     
-    # Mostrar mensaje de éxito con el resumen
-    st.success(f"✅ Datos guardados correctamente!")
-    st.info(f"📋 **Resumen del registro:** {resumen}")
-    
-    # Pequeña pausa para mostrar el mensaje
-    time.sleep(2)  # Aumenté a 2 segundos para que se pueda leer el resumen
+    # Confirmación como toast en el siguiente rerun, sin pausar el script
+    notificar("Datos guardados correctamente")
+    notificar(f"Resumen del registro: {resumen}", icono="📋")
     cerrar_modal()
+    st.rerun()
 
 def guardar_novedad():
     """Guarda los datos del formulario de novedad"""
@@ -910,10 +521,8 @@ def guardar_novedad():
         st.error("Por favor complete todos los campos obligatorios (*)")
         return
     
-    # Procesar la foto si existe
-    foto_data = None
-    if 'foto_capturada' in st.session_state and st.session_state.foto_capturada:
-        foto_data = st.session_state.foto_capturada
+    # La foto ya está guardada en disco; el registro solo lleva su huella
+    foto_huella = st.session_state.get('foto_huella')
     
     # Aquí puedes procesar los datos del formulario
     st.session_state.novedad_guardada = {
@@ -921,14 +530,17 @@ def guardar_novedad():
         'tipo_observacion': st.session_state.get('modal_tipo_observacion', ''),
         'urgencia': st.session_state.get('modal_urgencia', ''),
         'descripcion': st.session_state.get('modal_descripcion_novedad', ''),
-        'foto_adjunta': 'Sí' if foto_data else 'No'
+        'foto_adjunta': 'Sí' if foto_huella else 'No',
+        'foto': foto_huella or ''
     }
     
-    st.success("✅ Novedad registrada correctamente!")
-    if foto_data:
-        st.success("📸 Foto adjuntada correctamente")
-    time.sleep(1)  # Pequeña pausa para mostrar el mensaje
+    obtener_cola_registros().encolar(nuevo_registro('novedad', st.session_state.novedad_guardada))
+    
+    notificar("Novedad registrada correctamente")
+    if foto_huella:
+        notificar("Foto adjuntada correctamente", icono="📸")
     cerrar_modal()
+    st.rerun()
 
 def tomar_foto():
     """Activa la cámara para tomar una foto"""
@@ -936,8 +548,8 @@ def tomar_foto():
 
 def eliminar_foto():
     """Elimina la foto capturada"""
-    if 'foto_capturada' in st.session_state:
-        del st.session_state.foto_capturada
+    if 'foto_huella' in st.session_state:
+        del st.session_state.foto_huella
     if 'mostrar_camara' in st.session_state:
         st.session_state.mostrar_camara = False
 
@@ -966,6 +578,111 @@ def mostrar_ficha_acuerdo_servicio(acuerdo_seleccionado):
         </div>
         """, unsafe_allow_html=True)
 
+# -----------------------------
+# TABLA DE RESULTADOS PAGINADA EN EL SERVIDOR
+# -----------------------------
+TAMANOS_PAGINA = [25, 50, 100, 250]
+COLUMNAS_MAX_POR_DEFECTO = 12  # hojas anchas (p. ej. InventarioDiseño) arrancan con menos columnas
+SIN_ORDEN = "(sin ordenar)"
+
+def limpiar_estado_tablas():
+    """Reinicia página, orden y columnas de las tablas al llegar un resultado nuevo"""
+    for clave in [k for k in st.session_state.keys() if str(k).startswith('tabla_')]:
+        del st.session_state[clave]
+
+def mostrar_tabla_paginada(df, clave, columnas=None, nombres=None):
+    """Muestra solo la página visible de ``df`` con las columnas elegidas.
+
+    El orden, el tamaño de página y las columnas se resuelven en el servidor, así
+    que por cada rerun solo se serializa y envía al navegador ese trozo.
+    ``columnas`` limita las columnas disponibles y ``nombres`` las renombra al mostrarlas.
+    """
+    disponibles = [c for c in (columnas or df.columns) if c in df.columns and c != "Proyecto_norm"]
+    nombres = nombres or {}
+    # Si cambian las columnas disponibles (p. ej. llega la columna de riesgo) se reinicia la selección
+    clave_disponibles = f"tabla_{clave}_disponibles"
+    if st.session_state.get(clave_disponibles) != disponibles:
+        st.session_state[clave_disponibles] = disponibles
+        st.session_state.pop(f"tabla_{clave}_columnas", None)
+    
+    with st.expander("⚙️ Columnas, orden y paginación", expanded=False):
+        seleccion = st.multiselect(
+            "Columnas visibles",
+            options=disponibles,
+            default=disponibles[:COLUMNAS_MAX_POR_DEFECTO],
+            format_func=lambda c: nombres.get(c, c),
+            key=f"tabla_{clave}_columnas"
+        )
+        col_orden, col_dir, col_tam = st.columns([2, 1, 1])
+        with col_orden:
+            orden = st.selectbox("Ordenar por", options=[SIN_ORDEN] + disponibles,
+                                 format_func=lambda c: nombres.get(c, c), key=f"tabla_{clave}_orden")
+        with col_dir:
+            descendente = st.checkbox("Descendente", key=f"tabla_{clave}_desc")
+        with col_tam:
+            tamano = st.selectbox("Filas por página", options=TAMANOS_PAGINA, key=f"tabla_{clave}_tamano")
+    
+    total = len(df)
+    paginas = max(1, -(-total // tamano))
+    clave_pagina = f"tabla_{clave}_pagina"
+    if st.session_state.get(clave_pagina, 1) > paginas:
+        st.session_state[clave_pagina] = paginas
+    pagina = st.number_input(f"Página (de {paginas})", min_value=1, max_value=paginas, step=1, key=clave_pagina)
+    
+    inicio = (pagina - 1) * tamano
+    if orden != SIN_ORDEN:
+        # Se ordena solo la columna elegida y se toman las posiciones de la página
+        columna = df[orden].reset_index(drop=True)
+        try:
+            ordenada = columna.sort_values(ascending=not descendente, kind="stable", na_position="last")
+        except TypeError:
+            # Columnas object con tipos mezclados (p. ej. números y texto en un archivo subido): orden como texto
+            ordenada = columna.sort_values(ascending=not descendente, kind="stable", na_position="last",
+                                           key=lambda serie: serie.where(serie.isna(), serie.astype(str)))
+        posiciones = ordenada.index[inicio:inicio + tamano]
+        vista = df.iloc[posiciones]
+    else:
+        vista = df.iloc[inicio:inicio + tamano]
+    
+    if not seleccion:
+        st.info("No hay columnas seleccionadas. Elige al menos una en «⚙️ Columnas, orden y paginación».")
+        return
+    st.dataframe(vista[seleccion].rename(columns=nombres), use_container_width=True)
+    st.caption(f"Mostrando filas {min(inicio + 1, total)}–{min(inicio + tamano, total)} de {total}")
+
+TIPOS_REGISTRO = {'registro': "Registros", 'novedad': "Novedades"}
+DIAS_REGISTROS = {"Últimos 7 días": 7, "Últimos 30 días": 30, "Todo": None}
+
+def mostrar_registros_guardados():
+    """Consulta los registros y novedades guardados en la base local con filtros indexados"""
+    if not st.toggle("📋 Ver registros y novedades guardados", key='ver_registros'):
+        return
+    
+    col_tipo, col_proyecto, col_urgencia, col_periodo = st.columns(4)
+    with col_tipo:
+        tipo = st.selectbox("Tipo", options=[None, *TIPOS_REGISTRO],
+                            format_func=lambda t: TIPOS_REGISTRO.get(t, "Todos"), key='registros_tipo')
+    with col_proyecto:
+        proyecto = st.selectbox("Proyecto", options=[None, *OPCIONES_PROYECTO],
+                                format_func=lambda p: p or "Todos", key='registros_proyecto')
+    with col_urgencia:
+        urgencia = st.selectbox("Urgencia", options=[None, *OPCIONES_URGENCIA],
+                                format_func=lambda u: u or "Todas", key='registros_urgencia')
+    with col_periodo:
+        periodo = st.selectbox("Periodo", options=list(DIAS_REGISTROS), key='registros_periodo')
+    
+    dias = DIAS_REGISTROS[periodo]
+    desde = (datetime.now() - timedelta(days=dias)).isoformat(timespec="seconds") if dias else None
+    df_registros = obtener_almacen_registros().listar(tipo=tipo, proyecto=proyecto, urgencia=urgencia, desde=desde)
+    
+    pendientes = obtener_cola_registros().estadisticas()['pendientes']
+    if pendientes:
+        st.caption(f"{pendientes} registros en cola aún no aparecen en la consulta.")
+    if df_registros.empty:
+        st.info("No hay registros guardados con esos filtros.")
+    else:
+        mostrar_tabla_paginada(df_registros, 'registros')
+
 # -----------------------------
 # FUNCIONES PARA CAMBIAR ENTRE VISTAS
 # -----------------------------
@@ -989,6 +706,7 @@ def switch_to_chat():
 # HEADER: logo + títulos + BOTÓN DE PREDICCIÓN + BOTÓN MODAL
 # -----------------------------
 logo_path = os.path.join("assets", "logoMar.png")
+inicio_seccion = time.perf_counter()
 
 # Contenedor para alinear logo/títulos con los botones
 col_header_title, col_header_buttons = st.columns([7, 2])
@@ -996,15 +714,16 @@ col_header_title, col_header_buttons = st.columns([7, 2])
 with col_header_title:
     if os.path.exists(logo_path):
         try:
-            logo_img = Image.open(logo_path)
-            buffered = io.BytesIO()
-            logo_img.save(buffered, format="PNG")
-            img_b64 = base64.b64encode(buffered.getvalue()).decode()
+            estado_logo = os.stat(logo_path)
+            logo_src = src_imagen(
+                (logo_path, estado_logo.st_mtime_ns, estado_logo.st_size), "logo", LOGO_ALTO_PX,
+                pathlib.Path(logo_path).read_bytes
+            )
             
             st.markdown(
                 f"""
                 <div style="display:flex; align-items:center; gap:25px; margin-bottom:30px; padding-top:10px;">
-                    <img src="data:image/png;base64,{img_b64}" style="height:120px; width:auto;"/>
+                    <img src="{logo_src}" style="height:120px; width:auto;"/>
                     <div>
                         <p class="title">Sistema Integrado de Información de Proyectos</p>
                         <p class="subtitle">Asistente para el Seguimiento y Control — Constructora Marval</p>
@@ -1016,13 +735,14 @@ with col_header_title:
             st.markdown(f'<p class="title">Sistema Integrado de Información de Proyectos</p>', unsafe_allow_html=True)
     else:
         st.markdown(f'<p class="title">Sistema Integrado de Información de Proyectos</p>', unsafe_allow_html=True)
+registrar_seccion("Cabecera (logo)", time.perf_counter() - inicio_seccion)
 
 with col_header_buttons:
     st.markdown("<div style='height:75px;'></div>", unsafe_allow_html=True)
     col_pred, col_modal, col_novedad = st.columns([1, 1, 1])
     
     with col_pred:
-        if MODELO_NN:
+        if RUTAS_NN:
             if st.button("📈 previsión", key="btn_prediccion", type="secondary", use_container_width=True):
                 switch_to_predictor()
         else:
@@ -1058,6 +778,9 @@ if 'modal_tipo' not in st.session_state:
 if 'mostrar_camara' not in st.session_state:
     st.session_state.mostrar_camara = False
 
+# Avisos pendientes del rerun anterior (p. ej. confirmación de guardado)
+mostrar_notificaciones()
+
 # -----------------------------
 # CARGA DEL ARCHIVO EXCEL DESDE GITHUB
 # -----------------------------
@@ -1065,10 +788,18 @@ st.sidebar.markdown(f'<p style="color:{PALETTE["primary"]}; font-size: 24px; fon
 st.sidebar.subheader("Fuente de Datos")
 
 # Cargar datos desde GitHub
-excel_data = load_excel_from_github()
+with medir_seccion("Carga del Excel"):
+    excel_data = load_excel_from_github()
 
 if excel_data['success']:
-    st.sidebar.success("✅ Datos cargados correctamente desde GitHub")
+    if excel_data.get('origen') == 'local':
+        st.sidebar.warning("⚠️ Sin conexión con GitHub: usando la copia incluida en el repositorio")
+    elif excel_data.get('origen') == 'copia':
+        st.sidebar.warning("⚠️ Sin conexión con GitHub: usando la última copia descargada")
+    elif excel_data.get('origen') == 'cache':
+        st.sidebar.success("✅ Datos al día con GitHub (copia local revalidada, sin volver a descargar)")
+    else:
+        st.sidebar.success("✅ Datos cargados correctamente desde GitHub")
     
     # Asignar los DataFrames a variables globales
     df_avance = excel_data['avance']
@@ -1090,19 +821,16 @@ img_file = st.sidebar.file_uploader("Sube imagen splash (opcional)", type=["png"
 st.sidebar.markdown("---")
 st.sidebar.markdown("💡 **Consejo:** Los datos se cargan automáticamente desde el repositorio de GitHub.")
 
+# También arranca el envío de lo que quedó pendiente en la ejecución anterior
+sincronizador = obtener_sincronizador()
+if sincronizador is not None:
+    stats_sync = sincronizador.estadisticas()
+    st.sidebar.caption(f"Google Sheets: {stats_sync['enviados']} enviados · {stats_sync['pendientes']} pendientes")
+
 # -----------------------------
-# NORMALIZACIÓN (Ahora se ejecuta SIEMPRE que el Excel esté cargado)
+# VERIFICACIÓN DE HOJAS (la normalización se hace una vez por versión en preparar_datos)
 # -----------------------------
 if excel_loaded:
-    def normalizar_texto(texto):
-        texto = str(texto).lower()
-        texto = re.sub(r"[.,;:%]", "", texto)
-        texto = re.sub(r"\s+", " ", texto)
-        return texto.strip()
-
-    def quitar_tildes(texto):
-        return ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
-
     # Verificar que la columna 'Proyecto' exista en TODAS las hojas
     hojas_a_verificar = [
         ("Avance", df_avance), 
@@ -1119,61 +847,23 @@ if excel_loaded:
             if df_name in ["Avance", "Responsables", "Restricciones", "Sostenibilidad"]:
                  st.stop() 
 
-    # Crear 'Proyecto_norm' y construir la lista de proyectos
-    proyectos_list = []
-    for df in [df_avance, df_responsables, df_restricciones, df_sostenibilidad, df_avance_diseno, df_inventario_diseno]:
-        if "Proyecto" in df.columns:
-            df["Proyecto_norm"] = df["Proyecto"].astype(str).apply(lambda x: quitar_tildes(normalizar_texto(x)))
-            proyectos_list.append(df["Proyecto"].astype(str))
-        else:
-            df["Proyecto_norm"] = ""
+    # 'Proyecto_norm', el mapa de proyectos y el intérprete de preguntas se calculan al cargar cada versión de los datos
+    projects_map = excel_data['projects_map']
+    indices_proyecto = excel_data['indices_proyecto']
+    cubo_restricciones = excel_data['cubo_restricciones']
+    interpretar_pregunta = excel_data['interpretar_pregunta']
 
-    if proyectos_list:
-        all_projects = pd.concat(proyectos_list).dropna().unique()
-    else:
-        all_projects = []
-
-    projects_map = {quitar_tildes(normalizar_texto(p)): p for p in all_projects}
-
-    def extraer_proyecto(texto):
-        texto_norm = quitar_tildes(normalizar_texto(texto))
-        for norm in sorted(projects_map.keys(), key=len, reverse=True):
-            pattern = rf'(^|\W){re.escape(norm)}($|\W)'
-            if re.search(pattern, texto_norm, flags=re.UNICODE):
-                return projects_map[norm], norm
-        for norm in sorted(projects_map.keys(), key=len, reverse=True):
-            if norm in texto_norm:
-                return projects_map[norm], norm
-        return None, None
-
-    CARGOS_VALIDOS = [
-        "Analista de compras", "Analista de Programación", "Arquitecto",
-        "Contralor de proyectos", "Coordinador Administrativo de Proyectos", "Coordinador BIM",
-        "Coordinador Eléctrico", "Coordinador Logístico", "Coordinador SIG", "Coordinadora de pilotaje",
-        "Director de compras", "Director de obra", "Director Nacional Lean y BIM", "Director Técnico",
-        "Diseñador estructural", "Diseñador externo", "Equipo MARVAL", "Gerente de proyectos",
-        "Ingeniera Eléctrica", "Ingeniero Ambiental", "Ingeniero de Contratación", "Ingeniero electromecánico",
-        "Ingeniero FCA", "Ingeniero FCA #2", "Ingeniero Lean", "Ingeniero Lean 3", "Profesional SYST",
-        "Programador de obra", "Programador de obra #2", "Practicante de Interventoría #1",
-        "Practicante Lean", "Residente", "Residente #2", "Residente Administrativo de Equipos",
-        "Residente auxiliar", "Residente Auxiliar #2", "Residente Auxiliar #3", "Residente Auxiliar #4",
-        "Residente de acabados", "Residente de acabados #2", "Residente de control e interventoría",
-        "Residente de Equipos", "Residente de supervisión técnica", "Residente logístico", "Técnico de almacén"
-    ]
-    CARGOS_VALIDOS_NORM = {quitar_tildes(normalizar_texto(c)): c for c in CARGOS_VALIDOS}
-    
-    MAPEO_RESTRICCION = {
-        "material": "Materiales",
-        "materiales": "Materiales",
-        "diseno": "Diseño",
-        "diseño": "Diseño",
-        "contrato": "Contratos",
-        "contratos": "Contratos",
-        "permisos": "Permisos y Licencias",
-        "licencias": "Permisos y Licencias",
-        "financiero": "Financiera",
-        "financiera": "Financiera"
-    }
+    # -----------------------------
+    # CACHÉ COMPARTIDA DE RESPUESTAS
+    # -----------------------------
+    @st.cache_resource
+    def obtener_cache_respuestas():
+        """Caché LRU común a todas las sesiones; se vacía sola al cambiar la versión de los datos"""
+        return CacheLRU(max_bytes=64 * 2**20)
+
+    cache_respuestas = obtener_cache_respuestas()
+    stats_cache = cache_respuestas.estadisticas()
+    st.sidebar.caption(f"Caché de respuestas: {stats_cache['aciertos']} aciertos · {stats_cache['fallos']} fallos · {stats_cache['entradas']} entradas · {stats_cache['bytes'] / 2**20:.1f} MB")
 
     # -----------------------------
     # FUNCION DE RESPUESTA (MODIFICADA)
@@ -1189,71 +879,109 @@ if excel_loaded:
                 if df_resumen is not None:
                     # Guardar en session_state para uso posterior si es necesario
                     st.session_state.ultima_restriccion_procesada = datos_restriccion
-                    return f"📋 Resumen de Restricción de Contrato", df_resumen, None, 'restriccion_contrato', None
+                    return f"📋 Resumen de Restricción de Contrato", df_resumen, None, 'restriccion_contrato', None, None
         
-        proyecto, proyecto_norm = extraer_proyecto(pregunta)
+        consulta = interpretar_pregunta(pregunta_norm)
+        respuesta = cache_respuestas.obtener_o_calcular(
+            excel_data['version'], consulta, lambda: responder_consulta(consulta)
+        )
+        # El proyecto viaja con la respuesta para que las vistas lean sus agregados del cubo
+        return (*respuesta, consulta.proyecto_norm)
+
+    # -----------------------------
+    # GRÁFICO DE RESTRICCIONES MEMOIZADO POR (PROYECTO, VERSIÓN DE LOS DATOS)
+    # -----------------------------
+    # Solo depende del proyecto, mientras que la respuesta también varía con el tipo de
+    # restricción pedido; el resto de figuras ya quedan guardadas en la caché de respuestas
+    @st.cache_resource
+    def obtener_cache_graficos():
+        """Figuras Plotly ya construidas, comunes a todas las sesiones"""
+        return CacheLRU(max_bytes=16 * 2**20)
+
+    cache_graficos = obtener_cache_graficos()
+
+    def grafico_memoizado(tipo_grafico, proyecto_norm, construir):
+        return cache_graficos.obtener_o_calcular(excel_data['version'], (tipo_grafico, proyecto_norm), construir)
+
+    def construir_grafico_avance(df, proyecto):
+        import plotly.express as px
+        df_sum = df.groupby('Etapa')['Avance'].mean().reset_index()
+        grafico = px.bar(
+            df_sum,
+            x="Etapa",
+            y="Avance",
+            labels={"Etapa": "Etapa", "Avance": "Avance Promedio (%)"},
+            title=f"Avance Promedio por Etapa en {proyecto or 'Todos los Proyectos'}",
+            color_discrete_sequence=[PALETTE['primary']]
+        )
+        # Etiquetas formateadas por Plotly en el navegador, sin recorrer filas en Python
+        grafico.update_traces(texttemplate='%{y:.1f}%')
+        grafico.update_layout(
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            margin=dict(t=50, l=10, r=10, b=10)
+        )
+        return grafico
+
+    def construir_grafico_restricciones(proyecto_norm):
+        import plotly.express as px
+        grafico = px.bar(
+            conteo_por_tipo(cubo_restricciones, proyecto_norm),
+            x="tipoRestriccion",
+            y="count",
+            text="count",
+            labels={"tipoRestriccion": "Tipo de Restricción", "count": "Cantidad"},
+            color="tipoRestriccion",
+            color_discrete_sequence=px.colors.qualitative.Plotly
+        )
+        grafico.update_layout(
+            showlegend=False,
+            xaxis_title="Tipo de Restricción",
+            yaxis_title="Cantidad",
+            plot_bgcolor='white',
+            paper_bgcolor='white',
+            margin=dict(t=30, l=10, r=10, b=10)
+        )
+        return grafico
+
+    def responder_consulta(consulta):
+        """Filtra, agrega y grafica la respuesta a una Consulta ya interpretada"""
+        proyecto, proyecto_norm = consulta.proyecto, consulta.proyecto_norm
         
         # 🎯 Bloque de Avance de Obra
-        if "avance de obra" in pregunta_norm or "avance obra" in pregunta_norm:
-            df = df_avance.copy()
-            
-            if proyecto_norm and "Proyecto_norm" in df.columns:
-                df = df[df["Proyecto_norm"] == proyecto_norm]
+        if consulta.intencion == 'avance_obra':
+            df = filtrar_proyecto(df_avance, indices_proyecto['avance'], proyecto_norm)
             
             if df.empty:
                 return f"❌ No hay registros de avance de obra en {proyecto or 'todos'}", None, None, 'general', None
             
             grafico = None
             if PLOTLY_AVAILABLE and "Avance" in df.columns:
-                if 'Etapa' in df.columns and len(df['Etapa'].unique()) > 1:
-                    df_sum = df.groupby('Etapa')['Avance'].mean().reset_index()
-                    grafico = px.bar(
-                        df_sum,
-                        x="Etapa",
-                        y="Avance",
-                        text=df_sum["Avance"].apply(lambda x: f'{x:.1f}%'),
-                        labels={"Etapa": "Etapa", "Avance": "Avance Promedio (%)"},
-                        title=f"Avance Promedio por Etapa en {proyecto or 'Todos los Proyectos'}",
-                        color_discrete_sequence=[PALETTE['primary']]
-                    )
-                    grafico.update_layout(
-                        plot_bgcolor='white',
-                        paper_bgcolor='white',
-                        margin=dict(t=50, l=10, r=10, b=10)
-                    )
+                if 'Etapa' in df.columns and df['Etapa'].nunique() > 1:
+                    grafico = construir_grafico_avance(df, proyecto)
 
             return f"🚧 Avance de obra en {proyecto or 'todos'}:", df, grafico, 'general', None
 
         # 🎯 Bloque de Avance en Diseño y Estado Diseño
-        if "avance en diseno" in pregunta_norm or "avance diseno" in pregunta_norm or "estado diseno" in pregunta_norm or "inventario diseno" in pregunta_norm:
+        if consulta.intencion in ('avance_diseno', 'inventario_diseno'):
             
-            if "inventario" in pregunta_norm:
-                df = df_inventario_diseno.copy()
+            if consulta.intencion == 'inventario_diseno':
+                df = filtrar_proyecto(df_inventario_diseno, indices_proyecto['inventario_diseno'], proyecto_norm)
                 titulo_prefijo = "📑 Inventario de Diseño"
             else:
-                df = df_avance_diseno.copy()
+                df = filtrar_proyecto(df_avance_diseno, indices_proyecto['avance_diseno'], proyecto_norm)
                 titulo_prefijo = "📐 Avance de Diseño"
             
-            if proyecto_norm and "Proyecto_norm" in df.columns:
-                df = df[df["Proyecto_norm"] == proyecto_norm]
-            
             if df.empty:
                 return f"❌ No hay registros de diseño en {proyecto or 'todos'}", None, None, 'general', None
             
             return f"{titulo_prefijo} en {proyecto or 'todos'}:", df, None, 'general', None
             
         # 🎯 Bloque de Responsables
-        if "responsable" in pregunta_norm or "cargo" in pregunta_norm or any(c_norm in pregunta_norm for c_norm in CARGOS_VALIDOS_NORM.keys()):
-            df = df_responsables.copy()
-            
-            if proyecto_norm and "Proyecto_norm" in df.columns:
-                df = df[df["Proyecto_norm"] == proyecto_norm]
+        if consulta.intencion == 'responsables':
+            df = filtrar_proyecto(df_responsables, indices_proyecto['responsables'], proyecto_norm)
             
-            cargo_encontrado = None
-            for cargo_norm, cargo_real in CARGOS_VALIDOS_NORM.items():
-                if cargo_norm in pregunta_norm:
-                    cargo_encontrado = cargo_real
-                    break
+            cargo_encontrado = consulta.cargo
             
             if cargo_encontrado:
                 if 'Cargo' in df.columns:
@@ -1267,50 +995,29 @@ if excel_loaded:
             return f"👤 Responsables ({cargo_encontrado or 'todos'}) en {proyecto or 'todos'}:", df, None, 'general', None
 
         # 🎯 Bloque de Restricciones
-        if "restriccion" in pregunta_norm or "restricción" in pregunta_norm or "problema" in pregunta_norm:
-            df = df_restricciones.copy()
-            
-            if proyecto_norm and "Proyecto_norm" in df.columns:
-                df = df[df["Proyecto_norm"] == proyecto_norm]
+        if consulta.intencion == 'restricciones':
+            df = filtrar_proyecto(df_restricciones, indices_proyecto['restricciones'], proyecto_norm)
             
             tipo_restriccion_preseleccionado = 'Todas las restricciones'
             
-            if "tipoRestriccion" in df.columns:
-                for keyword, tipo_real in MAPEO_RESTRICCION.items():
-                    if f"restriccion de {keyword}" in pregunta_norm or f"restricciones de {keyword}" in pregunta_norm:
-                        if tipo_real in df["tipoRestriccion"].astype(str).unique().tolist():
-                            tipo_restriccion_preseleccionado = tipo_real
-                            break
+            if "tipoRestriccion" in df.columns and consulta.tipos_restriccion:
+                tipos_presentes = conteo_por_tipo(cubo_restricciones, proyecto_norm)['tipoRestriccion'].tolist()
+                for tipo_real in consulta.tipos_restriccion:
+                    if tipo_real in tipos_presentes:
+                        tipo_restriccion_preseleccionado = tipo_real
+                        break
             
             if df.empty:
                 return f"❌ No hay restricciones registradas en {proyecto or 'todos'}", None, None, 'general', None
 
             grafico = None
             if PLOTLY_AVAILABLE and "tipoRestriccion" in df.columns:
-                grafico = px.bar(
-                    df.groupby("tipoRestriccion").size().reset_index(name="count"),
-                    x="tipoRestriccion",
-                    y="count",
-                    text="count",
-                    labels={"tipoRestriccion": "Tipo de Restricción", "count": "Cantidad"},
-                    color="tipoRestriccion",
-                    color_discrete_sequence=px.colors.qualitative.Plotly
-                )
-                grafico.update_layout(
-                    showlegend=False,
-                    xaxis_title="Tipo de Restricción",
-                    yaxis_title="Cantidad",
-                    plot_bgcolor='white',
-                    paper_bgcolor='white',
-                    margin=dict(t=30, l=10, r=10, b=10)
-                )
+                grafico = grafico_memoizado('restricciones', proyecto_norm, lambda: construir_grafico_restricciones(proyecto_norm))
 
             return f"⚠️ Restricciones en {proyecto or 'todos'}:", df, grafico, 'restricciones', tipo_restriccion_preseleccionado
 
-        if any(k in pregunta_norm for k in ["sostenibilidad", "edge", "sostenible", "ambiental"]):
-            df = df_sostenibilidad.copy()
-            if proyecto_norm and "Proyecto_norm" in df.columns:
-                df = df[df["Proyecto_norm"] == proyecto_norm]
+        if consulta.intencion == 'sostenibilidad':
+            df = filtrar_proyecto(df_sostenibilidad, indices_proyecto['sostenibilidad'], proyecto_norm)
             if df.empty:
                 return f"❌ No hay registros de sostenibilidad en {proyecto or 'todos'}", None, None, 'general', None
             return f"🌱 Información de sostenibilidad en {proyecto or 'todos'}:", df, None, 'general', None
@@ -1321,8 +1028,83 @@ if excel_loaded:
 # -----------------------------
 # FUNCIÓN DE PREDICCIÓN (MLP)
 # -----------------------------
+@st.cache_resource(max_entries=48, show_spinner=False)
+def grafico_escenarios(_tabla, prioridad, tipo_contrato, cnc):
+    """Mapa de calor de probabilidad (días × reprogramaciones) leído de la tabla precalculada"""
+    import plotly.express as px
+    i_prioridad, i_contrato, i_cnc = _tabla.indices
+    probabilidades = _tabla.probabilidades[i_prioridad[prioridad], i_contrato[tipo_contrato], i_cnc[cnc]]
+    grafico = px.imshow(
+        probabilidades.T * 100,
+        x=_tabla.dias,
+        y=_tabla.reprogramaciones,
+        origin='lower',
+        aspect='auto',
+        zmin=0,
+        zmax=100,
+        color_continuous_scale='RdYlGn',
+        labels={"x": "Días de legalización esperados", "y": "Número de reprogramaciones", "color": "Cumplimiento (%)"},
+        title=f"Probabilidad de cumplimiento · {prioridad} / {tipo_contrato} / {cnc}"
+    )
+    grafico.update_layout(
+        plot_bgcolor='white',
+        paper_bgcolor='white',
+        margin=dict(t=50, l=10, r=10, b=10)
+    )
+    return grafico
+
+
+def mostrar_escenarios(tabla, prioridad, tipo_contrato, cnc):
+    """Análisis what-if para la prioridad/tipo/causa seleccionados en el formulario"""
+    if tabla is None or not PLOTLY_AVAILABLE:
+        return
+    st.markdown("<div style='height:15px;'></div>", unsafe_allow_html=True)
+    st.subheader("🔥 Escenarios: días vs. reprogramaciones")
+    st.plotly_chart(grafico_escenarios(tabla, prioridad, tipo_contrato, cnc), use_container_width=True)
+
+def mostrar_puntuacion_lote(mlp):
+    """Puntúa un CSV/XLSX de contratos con una sola llamada al modelo"""
+    st.markdown("<div style='height:15px;'></div>", unsafe_allow_html=True)
+    st.subheader("📦 Puntuación por lote")
+    st.caption("Sube un CSV o XLSX con las columnas: " + ", ".join(f"`{c}`" for c in COLUMNAS_ENTRADA))
+    archivo = st.file_uploader("Archivo de contratos", type=["csv", "xlsx"], key="lote_predictor_nn")
+    if archivo is None:
+        return
+
+    try:
+        lote = leer_lote(archivo.name, archivo)
+        inicio = time.perf_counter()
+        puntuado = puntuar_lote(lote, mlp.modelo, mlp.scaler, mlp.features)
+        duracion = time.perf_counter() - inicio
+    except Exception as e:
+        st.error(f"Error al puntuar el archivo: {e}")
+        return
+
+    filas = len(puntuado)
+    cumplidos = int((puntuado['prediccion'] == 1).sum())
+    col_filas, col_cumplidos, col_velocidad = st.columns(3)
+    col_filas.metric("Contratos", f"{filas:,}")
+    col_cumplidos.metric("Cumplimiento previsto", f"{cumplidos:,}")
+    col_velocidad.metric("Filas/s", f"{filas / duracion:,.0f}" if duracion > 0 else "—")
+    mostrar_tabla_paginada(puntuado, "lote_predictor")
+
+    base = os.path.splitext(archivo.name)[0]
+    if archivo.name.lower().endswith(".csv"):
+        datos_descarga = puntuado.to_csv(index=False).encode("utf-8")
+        nombre, mime = f"{base}_puntuado.csv", "text/csv"
+    else:
+        buffer = io.BytesIO()
+        puntuado.to_excel(buffer, index=False)
+        datos_descarga = buffer.getvalue()
+        nombre, mime = f"{base}_puntuado.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    st.download_button("⬇️ Descargar resultados", data=datos_descarga, file_name=nombre, mime=mime,
+                       key="descargar_lote_predictor")
+
 def mostrar_predictor_mlp():
-    if not MODELO_NN:
+    # Primera entrada a la vista: aquí se importan sklearn/joblib y se cargan los artefactos
+    with st.spinner("Cargando modelo de predicción..."):
+        mlp = obtener_mlp()
+    if mlp is None:
         st.error("No se pudo cargar el modelo de predicción de contratos (MLP). Verifica los archivos `.joblib` en la carpeta `assets`.")
         return
 
@@ -1350,37 +1132,20 @@ def mostrar_predictor_mlp():
 
         col_prior, col_tipo, col_cnc = st.columns(3)
         with col_prior:
-            prioridad_input = st.selectbox("Prioridad", options=['Alta', 'Media', 'Baja'], key='prioridad_input_nn')
+            prioridad_input = st.selectbox("Prioridad", options=OPCIONES_PRIORIDAD, key='prioridad_input_nn')
         with col_tipo:
-            contrato_input = st.selectbox("Tipo de contrato", options=['Obra', 'Suministro', 'Servicios', 'Subcontrato'], key='contrato_input_nn')
+            contrato_input = st.selectbox("Tipo de contrato", options=OPCIONES_TIPO_CONTRATO, key='contrato_input_nn')
         with col_cnc:
-            cnc_input = st.selectbox("Causa de retraso (CNCCompromiso)", options=['Aprobación interna', 'Proveedor', 'Legalización interna', 'Financiera'], key='cnc_input_nn')
+            cnc_input = st.selectbox("Causa de retraso (CNCCompromiso)", options=OPCIONES_CNC, key='cnc_input_nn')
 
         predict_button = st.form_submit_button("🚀 Predecir", type="primary", 
                                                on_click=lambda: setattr(st.session_state, 'prediction_result', None))
 
     if predict_button:
         try:
-            nuevo_df = pd.DataFrame({
-                'dias_legalizacion_esperados': [dias_input],
-                'numero_reprogramaciones': [reprog_input],
-                'prioridad': [prioridad_input],
-                'tipo_contrato': [contrato_input],
-                'CNCCompromiso': [cnc_input]
-            })
-
-            nuevo_df = pd.get_dummies(nuevo_df)
-            
-            for col in FEATURES_NN:
-                if col not in nuevo_df.columns:
-                    nuevo_df[col] = 0
-            nuevo_df = nuevo_df[FEATURES_NN]
-
-            cols_to_scale = ['dias_legalizacion_esperados', 'numero_reprogramaciones']
-            nuevo_df[cols_to_scale] = SCALER_NN.transform(nuevo_df[cols_to_scale])
-
-            prob_cumplimiento = MODELO_NN.predict_proba(nuevo_df)[0][1]
-            prediccion = MODELO_NN.predict(nuevo_df)[0]
+            prediccion, prob_cumplimiento = mlp.predecir(
+                dias_input, reprog_input, prioridad_input, contrato_input, cnc_input
+            )
             
             st.session_state.prediction_result = {
                 'prediccion': prediccion,
@@ -1404,6 +1169,9 @@ def mostrar_predictor_mlp():
             st.warning(f"### Predicción: ⚠️ Probable reprogramación")
             st.markdown(f"La probabilidad de **incumplimiento/reprogramación** es alta (Cumplimiento: `{prob_cumplimiento*100:.2f}%`). Se requiere seguimiento.")
         st.markdown("</div>", unsafe_allow_html=True)
+
+    mostrar_escenarios(mlp.tabla, prioridad_input, contrato_input, cnc_input)
+    mostrar_puntuacion_lote(mlp)
     
     # PIE DE PÁGINA PARA LA VISTA DE PREDICCIÓN
     st.markdown("""
@@ -1672,7 +1440,7 @@ elif st.session_state.modal_abierto and st.session_state.modal_tipo == "novedad"
     
     with col_camara2:
         # Botón para eliminar foto si existe
-        if 'foto_capturada' in st.session_state and st.session_state.foto_capturada:
+        if st.session_state.get('foto_huella'):
             if st.button("🗑️ Eliminar Foto", key="btn_eliminar_foto", use_container_width=True):
                 eliminar_foto()
     
@@ -1682,15 +1450,15 @@ elif st.session_state.modal_abierto and st.session_state.modal_tipo == "novedad"
         foto_capturada = st.camera_input("Toma una foto de la novedad", key="camera_input_novedad")
         
         if foto_capturada:
-            # Guardar la foto en el estado de sesión
-            st.session_state.foto_capturada = foto_capturada
+            # Se comprime y guarda una sola vez; la sesión conserva solo la huella
+            st.session_state.foto_huella = guardar_foto(foto_capturada.getvalue())
             st.session_state.mostrar_camara = False
             st.rerun()
     
     # Mostrar vista previa de la foto si existe
-    if 'foto_capturada' in st.session_state and st.session_state.foto_capturada:
+    if st.session_state.get('foto_huella'):
         st.success("✅ Foto capturada - Vista previa:")
-        st.image(st.session_state.foto_capturada, caption="Foto adjuntada", use_column_width=True)
+        st.image(ruta_miniatura(st.session_state.foto_huella), caption="Foto adjuntada")
     
     # Información de campos obligatorios
     st.markdown("<small>* Campos obligatorios</small>", unsafe_allow_html=True)
@@ -1730,227 +1498,330 @@ elif st.session_state.modal_abierto and st.session_state.modal_tipo == "novedad"
 # -----------------------------
 # SPLASH (opcional)
 # -----------------------------
+# Se muestra una vez por imagen subida y se desvanece por CSS (clase mar-splash), sin bloquear el script.
+# Las imágenes subidas por usuarios no se publican en static/: van en línea, ya reescaladas
 placeholder = st.empty()
-if img_file:
+if img_file and st.session_state.get('splash_mostrado') != img_file.file_id:
+    st.session_state.splash_mostrado = img_file.file_id
     try:
-        img_file.seek(0)
-        img_b64 = base64.b64encode(img_file.read()).decode()
+        optimizada, extension = optimizar_imagen(img_file.getvalue(), SPLASH_ALTO_PX)
+        splash_src = data_uri(optimizada, f"splash.{extension}")
         splash_html = f"""
-        <div style="position: fixed; top: 0; left: 0; width: 100%; height: 100vh; background-color: white; display: flex; justify-content: center; align-items: center; z-index: 9999;">
+        <div class="mar-splash" style="position: fixed; top: 0; left: 0; width: 100%; height: 100vh; background-color: white; display: flex; justify-content: center; align-items: center; z-index: 9999;">
             <div style="text-align:center; padding: 20px; border-radius: 12px;">
-                <img src="data:image/png;base64,{img_b64}" style="width:180px; max-width:60vw; height:auto; display:block; margin:0 auto;">
+                <img src="{splash_src}" style="width:180px; max-width:60vw; height:auto; display:block; margin:0 auto;">
                 <p style="margin-top: 20px; color: {PALETTE['primary']}; font-size: 20px; font-weight: 600;">Cargando...</p>
             </div>
         </div>
         """
         placeholder.markdown(splash_html, unsafe_allow_html=True)
-        time.sleep(1)
-        placeholder.empty()
     except Exception:
         placeholder.empty()
 
 # -----------------------------
-# LÓGICA DE VISTAS PRINCIPALES - INTERFAZ DE CHAT (PREGUNTAS)
+# CONSULTAS: TEXTO Y VOZ
 # -----------------------------
-if st.session_state.current_view == 'predictor':
-    mostrar_predictor_mlp()
-
-elif st.session_state.current_view == 'chat':
-    # INTERFAZ CHAT - AHORA SE MUESTRA CORRECTAMENTE
-    st.markdown(
-        f'<div class="mar-card"><p style="color:{PALETTE["primary"]}; font-size: 18px; font-weight:700; margin:0 0 8px 0;">Consulta Rápida</p>'
-        '<p style="margin:0 0 0 0;">Escribe tu consulta relacionada con el estado u contexto de los proyectos. Ej: "restricciones de materiales en Burdeos" o "Restriccion contrato en Proyecto + Componente + Acuerdo + Detalle"</p></div>',
-        unsafe_allow_html=True
-    )
-
-    with st.form("query_form", clear_on_submit=False):
-        col_input, col_enviar, col_voz = st.columns([6, 1.2, 1])
-        
-        with col_input:
-            pregunta = st.text_input(label="", placeholder="Ej: 'Avance de obra en proyecto Altos del Mar' o 'Restriccion contrato en El Castell Iberia + Torre 1 + Provisional electrico + Falta aprobación'", label_visibility="collapsed", key='chat_query')
-        
-        with col_enviar:
-            enviar = st.form_submit_button("Buscar", key="btn_buscar", type="secondary", use_container_width=True)
-        
-        with col_voz:
-            voz = st.form_submit_button("🎤 Voz", key="voz", help="Activar entrada por voz", type="secondary", use_container_width=True)
+def ejecutar_consulta(pregunta):
+    """Responde la consulta, guarda el resultado en la sesión y vuelve a ejecutar la app"""
+    if not excel_loaded:
+        st.error("No se puede consultar. ¡Los datos no se cargaron correctamente desde GitHub!")
+        return
+    st.session_state['last_query_text'] = pregunta
+    titulo, df_resultado, grafico, tipo_resultado, tipo_restriccion_preseleccionado, proyecto_norm = generar_respuesta(pregunta)
+    
+    if tipo_resultado == 'restricciones':
+        st.session_state['tipo_restriccion_preseleccionado'] = tipo_restriccion_preseleccionado
+        st.session_state['last_query_result'] = (titulo, df_resultado, grafico, tipo_resultado, proyecto_norm)
+    else:
+        if 'tipo_restriccion_preseleccionado' in st.session_state:
+            del st.session_state['tipo_restriccion_preseleccionado']
+        st.session_state['last_query_result'] = (titulo, df_resultado, grafico, tipo_resultado, proyecto_norm)
 
-    # Lógica de procesamiento de la pregunta - AHORA USA excel_loaded
-    if enviar and pregunta:
-        if not excel_loaded:
-            st.error("No se puede consultar. ¡Los datos no se cargaron correctamente desde GitHub!")
-        else:
-            st.session_state['last_query_text'] = pregunta
-            titulo, df_resultado, grafico, tipo_resultado, tipo_restriccion_preseleccionado = generar_respuesta(pregunta)
-            
-            if tipo_resultado == 'restricciones':
-                st.session_state['tipo_restriccion_preseleccionado'] = tipo_restriccion_preseleccionado
-                st.session_state['last_query_result'] = (titulo, df_resultado, grafico, tipo_resultado)
-            else:
-                if 'tipo_restriccion_preseleccionado' in st.session_state:
-                    del st.session_state['tipo_restriccion_preseleccionado']
-                st.session_state['last_query_result'] = (titulo, df_resultado, grafico, tipo_resultado)
+    if 'filtro_restriccion' in st.session_state:
+        del st.session_state['filtro_restriccion']
+    limpiar_estado_tablas()
+    
+    st.rerun()
 
-            if 'filtro_restriccion' in st.session_state:
-                del st.session_state['filtro_restriccion']
-            
-            st.rerun()
+@st.cache_resource
+def obtener_transcriptor():
+    """Whisper cargado una vez por proceso y compartido entre sesiones, o None si no está disponible"""
+    ruta = ruta_modelo()
+    return TranscriptorVoz(ruta) if ruta else None
+
+def mostrar_entrada_voz():
+    """Graba o sube un audio, lo transcribe en el grupo de Whisper y lanza la consulta"""
+    transcriptor = obtener_transcriptor()
+    if transcriptor is None:
+        st.info(f"La entrada por voz necesita el paquete whisper y los pesos del modelo en {DIR_MODELOS_WHISPER}.")
+        return
+    
+    col_grabar, col_subir = st.columns(2)
+    with col_grabar:
+        grabacion = st.audio_input("Graba tu consulta", key="voz_grabacion")
+    with col_subir:
+        clip = st.file_uploader("o sube un clip WAV", type=["wav"], key="voz_clip")
+    audio = grabacion or clip
+    if audio is None:
+        return
+    
+    # El audio sigue en el widget en cada rerun: se transcribe una sola vez, salga bien o
+    # mal; tras un fallo solo se vuelve a enviar si el usuario pide reintentar
+    contenido = audio.getvalue()
+    huella = hashlib.sha256(contenido).hexdigest()
+    if st.session_state.get('voz_procesada') != huella:
+        st.session_state.voz_procesada = huella
+        texto, st.session_state.voz_aviso = transcribir_clip(transcriptor, contenido)
+        if texto:
+            # El campo de texto ya existe en este rerun; se rellena al inicio del siguiente
+            st.session_state.consulta_voz = texto
+            st.session_state.mostrar_voz = False
+            ejecutar_consulta(texto)
+            return
+    
+    aviso = st.session_state.get('voz_aviso')
+    if aviso:
+        nivel, mensaje = aviso
+        getattr(st, nivel)(mensaje)
+        st.button("🔄 Reintentar", key="voz_reintentar", on_click=reintentar_voz)
+
+def transcribir_clip(transcriptor, contenido):
+    """Devuelve (texto, None) o, si no hay consulta, (None, (nivel, mensaje)) para el aviso"""
+    futuro = transcriptor.enviar(contenido)
+    if futuro is None:
+        return None, ('warning', "Hay varias transcripciones en curso. Intenta de nuevo en unos segundos.")
+    with st.spinner("Transcribiendo audio..."):
+        try:
+            texto = futuro.result()
+        except Exception as e:
+            return None, ('error', f"No se pudo transcribir el audio: {e}")
+    if not texto:
+        return None, ('warning', "No se reconoció ninguna consulta en el audio.")
+    return texto, None
 
-    # MOSTRAR RESULTADOS
-    if 'last_query_result' in st.session_state:
-        titulo, df_resultado, grafico, tipo_resultado = st.session_state['last_query_result']
-        
-        st.markdown(f'<div class="mar-card" style="margin-top:20px;"><p style="color:{PALETTE["primary"]}; font-size: 20px; font-weight:700; margin:0 0 8px 0;">{titulo}</p></div>', unsafe_allow_html=True)
+def reintentar_voz():
+    st.session_state.pop('voz_procesada', None)
+    st.session_state.pop('voz_aviso', None)
 
-        # 🆕 NUEVO TIPO: Restricción de contrato con estructura específica
-        if tipo_resultado == 'restriccion_contrato':
-            st.markdown(f'<div class="mar-card" style="margin-top:0px;">', unsafe_allow_html=True)
-            st.markdown("### Resumen de Campos de Restricción")
+# -----------------------------
+# LÓGICA DE VISTAS PRINCIPALES - INTERFAZ DE CHAT (PREGUNTAS)
+# -----------------------------
+# Con "with" el tiempo se registra aunque la vista termine en st.rerun() o st.stop()
+with medir_seccion("Vista principal"):
+    if st.session_state.current_view == 'predictor':
+        mostrar_predictor_mlp()
+
+    elif st.session_state.current_view == 'chat':
+        # INTERFAZ CHAT - AHORA SE MUESTRA CORRECTAMENTE
+        st.markdown(
+            f'<div class="mar-card"><p style="color:{PALETTE["primary"]}; font-size: 18px; font-weight:700; margin:0 0 8px 0;">Consulta Rápida</p>'
+            '<p style="margin:0 0 0 0;">Escribe tu consulta relacionada con el estado u contexto de los proyectos. Ej: "restricciones de materiales en Burdeos" o "Restriccion contrato en Proyecto + Componente + Acuerdo + Detalle"</p></div>',
+            unsafe_allow_html=True
+        )
+
+        if 'consulta_voz' in st.session_state:
+            st.session_state.chat_query = st.session_state.pop('consulta_voz')
+
+        with st.form("query_form", clear_on_submit=False):
+            col_input, col_enviar, col_voz = st.columns([6, 1.2, 1])
             
-            # Mostrar la tabla con estilo mejorado
-            st.dataframe(
-                df_resultado,
-                hide_index=True,
-                use_container_width=True,
-                column_config={
-                    "Campo": st.column_config.Column("Campo", width="medium"),
-                    "Valor": st.column_config.TextColumn("Valor", width="large")
-                }
-            )
+            with col_input:
+                pregunta = st.text_input(label="", placeholder="Ej: 'Avance de obra en proyecto Altos del Mar' o 'Restriccion contrato en El Castell Iberia + Torre 1 + Provisional electrico + Falta aprobación'", label_visibility="collapsed", key='chat_query')
             
-            # Opcional: Mostrar el resumen concatenado también
-            if hasattr(st.session_state, 'ultima_restriccion_procesada'):
-                datos = st.session_state.ultima_restriccion_procesada
-                resumen_concatenado = f"{datos['proyecto']} + {datos['componente']} + {datos['acuerdo_servicio']} + {datos['detalle']}"
-                st.markdown(f"**Resumen concatenado:** `{resumen_concatenado}`")
+            with col_enviar:
+                enviar = st.form_submit_button("Buscar", key="btn_buscar", type="secondary", use_container_width=True)
             
-            st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Los tipos existentes (restricciones, general, etc.)
-        elif tipo_resultado == 'restricciones':
-            if "tipoRestriccion" in df_resultado.columns:
-                tipos_restriccion = ['Todas las restricciones'] + df_resultado["tipoRestriccion"].astype(str).unique().tolist()
-            else:
-                tipos_restriccion = ['Todas las restricciones']
-                
-            default_index = 0
-            if 'tipo_restriccion_preseleccionado' in st.session_state and st.session_state['tipo_restriccion_preseleccionado'] in tipos_restriccion:
-                default_index = tipos_restriccion.index(st.session_state['tipo_restriccion_preseleccionado'])
-                
-            filtro_restriccion = st.selectbox(
-                "Filtro por Tipo de Restricción:",
-                options=tipos_restriccion,
-                index=default_index,
-                key='filtro_restriccion',
-                label_visibility="visible"
-            )
+            with col_voz:
+                voz = st.form_submit_button("🎤 Voz", key="voz", help="Activar entrada por voz", type="secondary", use_container_width=True)
 
-            df_filtrado = df_resultado.copy()
-            if filtro_restriccion != 'Todas las restricciones' and "tipoRestriccion" in df_filtrado.columns:
-                df_filtrado = df_filtrado[df_filtrado["tipoRestriccion"] == filtro_restriccion]
+        if voz:
+            st.session_state.mostrar_voz = not st.session_state.get('mostrar_voz', False)
 
-            col_dias, col_filtro = st.columns([1, 2])
-            
-            if all(col in df_filtrado.columns for col in ["FechaCompromisoActual", "FechaCompromisoInicial"]):
-                df_filtrado['FechaCompromisoActual'] = pd.to_datetime(df_filtrado['FechaCompromisoActual'], errors='coerce')
-                df_filtrado['FechaCompromisoInicial'] = pd.to_datetime(df_filtrado['FechaCompromisoInicial'], errors='coerce')
-                df_filtrado['DiasDiferencia'] = (df_filtrado['FechaCompromisoActual'] - df_filtrado['FechaCompromisoInicial']).dt.days
-            else:
-                 df_filtrado['DiasDiferencia'] = pd.NA
+        # Lógica de procesamiento de la pregunta - AHORA USA excel_loaded
+        if enviar and pregunta:
+            ejecutar_consulta(pregunta)
 
-            with col_dias:
-                dias_diferencia_df = None
-                df_valido = df_filtrado.dropna(subset=['DiasDiferencia']).copy()
+        if st.session_state.get('mostrar_voz'):
+            mostrar_entrada_voz()
 
-                if not df_valido.empty:
-                    restricciones_reprogramadas = df_valido[df_valido['DiasDiferencia'] > 0]
-                    total_restricciones = len(df_valido)
-                    total_restricciones_reprogramadas = len(restricciones_reprogramadas)
-                    promedio_dias_retraso = restricciones_reprogramadas['DiasDiferencia'].mean()
-                    
-                    data = {
-                        'Métrica': [
-                            'Total Restricciones (con Fechas)',
-                            'Restricciones Reprogramadas (Días > 0)', 
-                            'Promedio Días de Retraso (Por Reprogramada)'
-                        ],
-                        'Valor': [
-                            total_restricciones,
-                            total_restricciones_reprogramadas, 
-                            f"{promedio_dias_retraso:,.2f}" if not pd.isna(promedio_dias_retraso) else "0.00"
-                        ]
-                    }
-                    dias_diferencia_df = pd.DataFrame(data)
-
-                if dias_diferencia_df is not None:
-                    st.markdown('<div class="mar-card" style="background-color:#fff3e0; padding: 15px;">', unsafe_allow_html=True)
-                    st.markdown('📅 **Resumen de Demoras por Reprogramación**', unsafe_allow_html=True)
-                    st.dataframe(
-                        dias_diferencia_df, 
-                        hide_index=True, 
-                        use_container_width=True,
-                        column_config={
-                            "Métrica": st.column_config.Column("Métrica de Demora", width="medium"),
-                            "Valor": st.column_config.TextColumn("Resultado", width="small")
-                        }
-                    )
-                    st.markdown('<p style="font-size:12px; margin:0; color:#8d6e63;">*Datos filtrados por el tipo de restricción actual.</p>', unsafe_allow_html=True)
-                    st.markdown('</div>', unsafe_allow_html=True)
-                else:
-                    st.info("No hay datos de fechas válidos para calcular la diferencia de días.")
+        # MOSTRAR RESULTADOS
+        if 'last_query_result' in st.session_state:
+            titulo, df_resultado, grafico, tipo_resultado, proyecto_norm = st.session_state['last_query_result']
+            
+            st.markdown(f'<div class="mar-card" style="margin-top:20px;"><p style="color:{PALETTE["primary"]}; font-size: 20px; font-weight:700; margin:0 0 8px 0;">{titulo}</p></div>', unsafe_allow_html=True)
 
-            with col_filtro:
-                st.markdown(f'<p style="font-weight:600; color:{PALETTE["primary"]}; margin-top:15px; margin-bottom:10px;">Detalle de Restricciones ({len(df_filtrado)} encontradas)</p>', unsafe_allow_html=True)
-                
-                columns_to_show = [
-                    'Actividad', 
-                    'Restriccion', 
-                    'numeroReprogramacionesCompromiso', 
-                    'Descripción', 
-                    'tipoRestriccion', 
-                    'FechaCompromisoInicial', 
-                    'FechaCompromisoActual', 
-                    'DiasDiferencia', 
-                    'Responsable', 
-                    'Comentarios'
-                ]
+            # 🆕 NUEVO TIPO: Restricción de contrato con estructura específica
+            if tipo_resultado == 'restriccion_contrato':
+                st.markdown(f'<div class="mar-card" style="margin-top:0px;">', unsafe_allow_html=True)
+                st.markdown("### Resumen de Campos de Restricción")
                 
-                df_display = df_filtrado.filter(items=columns_to_show)
+                # Mostrar la tabla con estilo mejorado
+                st.dataframe(
+                    df_resultado,
+                    hide_index=True,
+                    use_container_width=True,
+                    column_config={
+                        "Campo": st.column_config.Column("Campo", width="medium"),
+                        "Valor": st.column_config.TextColumn("Valor", width="large")
+                    }
+                )
                 
-                rename_map = {}
-                if 'DiasDiferencia' in df_display.columns:
-                     rename_map['DiasDiferencia'] = 'Diferencia (Días)'
-                if 'numeroReprogramacionesCompromiso' in df_display.columns:
-                     rename_map['numeroReprogramacionesCompromiso'] = 'Núm. Reprog.'
-                     
-                df_display = df_display.rename(columns=rename_map)
-
-                st.dataframe(df_display, use_container_width=True)
+                # Opcional: Mostrar el resumen concatenado también
+                if hasattr(st.session_state, 'ultima_restriccion_procesada'):
+                    datos = st.session_state.ultima_restriccion_procesada
+                    resumen_concatenado = f"{datos['proyecto']} + {datos['componente']} + {datos['acuerdo_servicio']} + {datos['detalle']}"
+                    st.markdown(f"**Resumen concatenado:** `{resumen_concatenado}`")
                 
-            if grafico:
-                st.markdown('<div class="mar-card" style="margin-top: 25px;">', unsafe_allow_html=True)
-                st.markdown(f'<p style="font-weight:600; color:{PALETTE["primary"]}; margin-bottom:5px;">Conteo por Tipo de Restricción (Todos los Proyectos/Tipo)</p>', unsafe_allow_html=True)
-                st.plotly_chart(grafico, use_container_width=True)
                 st.markdown('</div>', unsafe_allow_html=True)
-                
-        else:
-            if df_resultado is not None:
-                st.markdown(f'<div class="mar-card" style="margin-top:0px;">', unsafe_allow_html=True)
+            
+            # Los tipos existentes (restricciones, general, etc.)
+            elif tipo_resultado == 'restricciones':
+                if "tipoRestriccion" in df_resultado.columns:
+                    tipos_restriccion = ['Todas las restricciones'] + df_resultado["tipoRestriccion"].astype(str).unique().tolist()
+                else:
+                    tipos_restriccion = ['Todas las restricciones']
+                    
+                default_index = 0
+                if 'tipo_restriccion_preseleccionado' in st.session_state and st.session_state['tipo_restriccion_preseleccionado'] in tipos_restriccion:
+                    default_index = tipos_restriccion.index(st.session_state['tipo_restriccion_preseleccionado'])
+                    
+                filtro_restriccion = st.selectbox(
+                    "Filtro por Tipo de Restricción:",
+                    options=tipos_restriccion,
+                    index=default_index,
+                    key='filtro_restriccion',
+                    label_visibility="visible"
+                )
+
+                # Las fechas tipadas y DiasDiferencia vienen calculadas desde la carga de los datos
+                df_filtrado = df_resultado
+                if filtro_restriccion != 'Todas las restricciones' and "tipoRestriccion" in df_filtrado.columns:
+                    df_filtrado = df_filtrado[df_filtrado["tipoRestriccion"] == filtro_restriccion]
+
+                # Riesgo calculado en segundo plano (una vez por versión, al mostrar restricciones por primera vez):
+                # solo se alinea por índice, sin inferencia por consulta
+                # Solo si la hoja registra las cinco entradas del modelo (ver MAPEO_COLUMNAS_RESTRICCION)
+                con_entradas_riesgo = RUTAS_NN and not columnas_riesgo_faltantes(df_restricciones)
+                mlp = obtener_mlp() if con_entradas_riesgo else None
+                futuro_riesgo = riesgo_restricciones(excel_data['version'], df_restricciones, mlp) if mlp is not None else None
+                riesgo = riesgo_disponible(futuro_riesgo)
+                filtro_riesgo_activo = False
+                if riesgo is not None and not riesgo.empty:
+                    df_filtrado = df_filtrado.assign(**{COLUMNA_RIESGO: riesgo.reindex(df_filtrado.index)})
+                    umbral_riesgo = st.slider(
+                        "Contratos con probabilidad de cumplimiento hasta (%):",
+                        min_value=0, max_value=100, value=100, step=5,
+                        key='tabla_restricciones_riesgo'
+                    )
+                    if umbral_riesgo < 100:
+                        filtro_riesgo_activo = True
+                        df_filtrado = df_filtrado[df_filtrado[COLUMNA_RIESGO] <= umbral_riesgo]
+                elif futuro_riesgo is not None and not futuro_riesgo.done():
+                    st.caption("⏳ Calculando la probabilidad de cumplimiento de los contratos...")
+
+                col_dias, col_filtro = st.columns([1, 2])
+
+                with col_dias:
+                    dias_diferencia_df = None
+                    # Indicadores precalculados en el cubo (proyecto × tipo de restricción)
+                    if filtro_riesgo_activo:
+                        # El cubo no conoce el umbral de riesgo: se agregan solo las filas visibles
+                        kpis = kpis_restricciones(construir_cubo_restricciones(df_filtrado)) if not df_filtrado.empty else None
+                    else:
+                        kpis = kpis_restricciones(
+                            cubo_restricciones,
+                            proyecto_norm,
+                            None if filtro_restriccion == 'Todas las restricciones' else filtro_restriccion
+                        )
+
+                    if kpis is not None and kpis['con_fechas'] > 0:
+                        total_restricciones = int(kpis['con_fechas'])
+                        total_restricciones_reprogramadas = int(kpis['reprogramadas'])
+                        promedio_dias_retraso = kpis['promedio_dias_retraso']
+                        
+                        data = {
+                            'Métrica': [
+                                'Total Restricciones (con Fechas)',
+                                'Restricciones Reprogramadas (Días > 0)', 
+                                'Promedio Días de Retraso (Por Reprogramada)'
+                            ],
+                            'Valor': [
+                                total_restricciones,
+                                total_restricciones_reprogramadas, 
+                                f"{promedio_dias_retraso:,.2f}" if not pd.isna(promedio_dias_retraso) else "0.00"
+                            ]
+                        }
+                        dias_diferencia_df = pd.DataFrame(data)
+
+                    if dias_diferencia_df is not None:
+                        st.markdown('<div class="mar-card" style="background-color:#fff3e0; padding: 15px;">', unsafe_allow_html=True)
+                        st.markdown('📅 **Resumen de Demoras por Reprogramación**', unsafe_allow_html=True)
+                        st.dataframe(
+                            dias_diferencia_df, 
+                            hide_index=True, 
+                            use_container_width=True,
+                            column_config={
+                                "Métrica": st.column_config.Column("Métrica de Demora", width="medium"),
+                                "Valor": st.column_config.TextColumn("Resultado", width="small")
+                            }
+                        )
+                        nota_filtro = ("el tipo de restricción y la probabilidad de cumplimiento actuales" if filtro_riesgo_activo
+                                       else "el tipo de restricción actual")
+                        st.markdown(f'<p style="font-size:12px; margin:0; color:#8d6e63;">*Datos filtrados por {nota_filtro}.</p>', unsafe_allow_html=True)
+                        st.markdown('</div>', unsafe_allow_html=True)
+                    else:
+                        st.info("No hay datos de fechas válidos para calcular la diferencia de días.")
+
+                with col_filtro:
+                    st.markdown(f'<p style="font-weight:600; color:{PALETTE["primary"]}; margin-top:15px; margin-bottom:10px;">Detalle de Restricciones ({len(df_filtrado)} encontradas)</p>', unsafe_allow_html=True)
+                    
+                    columns_to_show = [
+                        'Actividad', 
+                        'Restriccion', 
+                        'numeroReprogramacionesCompromiso', 
+                        COLUMNA_RIESGO,
+                        'Descripción', 
+                        'tipoRestriccion', 
+                        'FechaCompromisoInicial', 
+                        'FechaCompromisoActual', 
+                        'DiasDiferencia', 
+                        'Responsable', 
+                        'Comentarios'
+                    ]
+                    
+                    rename_map = {
+                        'DiasDiferencia': 'Diferencia (Días)',
+                        'numeroReprogramacionesCompromiso': 'Núm. Reprog.',
+                        COLUMNA_RIESGO: 'Prob. Cumplimiento (%)'
+                    }
+
+                    # Solo la página visible y las columnas elegidas viajan al navegador
+                    mostrar_tabla_paginada(df_filtrado, 'restricciones', columnas=columns_to_show, nombres=rename_map)
+                    
                 if grafico:
+                    st.markdown('<div class="mar-card" style="margin-top: 25px;">', unsafe_allow_html=True)
+                    st.markdown(f'<p style="font-weight:600; color:{PALETTE["primary"]}; margin-bottom:5px;">Conteo por Tipo de Restricción (Todos los Proyectos/Tipo)</p>', unsafe_allow_html=True)
                     st.plotly_chart(grafico, use_container_width=True)
-                
-                st.dataframe(df_resultado.drop(columns=["Proyecto_norm"], errors='ignore'), use_container_width=True)
-                st.markdown('</div>', unsafe_allow_html=True)
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    
             else:
-                st.error(titulo)
-    
-    # PIE DE PÁGATA PARA LA VISTA DEL CHAT
-    st.markdown("""
-    <div class='custom-footer'>
-        Mar Agent, Version 1.0. Constructora Marval
-    </div>
-    """, unsafe_allow_html=True)
-    st.markdown("<div style='height: 50px;'></div>", unsafe_allow_html=True)
-
-
+                if df_resultado is not None:
+                    st.markdown(f'<div class="mar-card" style="margin-top:0px;">', unsafe_allow_html=True)
+                    if grafico:
+                        st.plotly_chart(grafico, use_container_width=True)
+                    
+                    mostrar_tabla_paginada(df_resultado, 'resultado')
+                    st.markdown('</div>', unsafe_allow_html=True)
+                else:
+                    st.error(titulo)
+        
+        mostrar_registros_guardados()
+        
+        # PIE DE PÁGATA PARA LA VISTA DEL CHAT
+        st.markdown("""
+        <div class='custom-footer'>
+            Mar Agent, Version 1.0. Constructora Marval
+        </div>
+        """, unsafe_allow_html=True)
+        st.markdown("<div style='height: 50px;'></div>", unsafe_allow_html=True)
 
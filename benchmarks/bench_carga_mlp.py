@@ -0,0 +1,51 @@
+"""Coste de arranque del MLP por proceso: comprobación barata (predictor.rutas_artefactos)
+frente a la carga anticipada anterior (importar joblib/sklearn y cargar los artefactos).
+
+Cada variante corre en un proceso nuevo; se informa tiempo y memoria residente máxima.
+
+Uso: python benchmarks/bench_carga_mlp.py
+"""
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VARIANTES = {
+    'diferida (solo comprobación)': "rutas = rutas_artefactos()",
+    'anticipada (carga completa)': "rutas = rutas_artefactos(); cargar_artefactos(rutas)",
+}
+
+PLANTILLA = """
+import resource, time, warnings
+warnings.simplefilter('ignore')
+inicio = time.perf_counter()
+from predictor import cargar_artefactos, rutas_artefactos
+{codigo}
+duracion = time.perf_counter() - inicio
+print(duracion, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+REPETICIONES = 3
+
+
+def medir(codigo):
+    tiempos, memorias = [], []
+    for _ in range(REPETICIONES):
+        salida = subprocess.run(
+            [sys.executable, "-c", PLANTILLA.format(codigo=codigo)],
+            cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.split()
+        tiempos.append(float(salida[0]))
+        memorias.append(int(salida[1]))
+    return min(tiempos), min(memorias) / 1024
+
+
+def main():
+    print(f"{'variante':<30} {'tiempo (ms)':>12} {'RSS máx. (MB)':>14}")
+    for nombre, codigo in VARIANTES.items():
+        tiempo, memoria = medir(codigo)
+        print(f"{nombre:<30} {tiempo * 1000:>12.0f} {memoria:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Compara la lectura hoja por hoja (anterior) con la lectura en una sola pasada.
+
+Uso: python benchmarks/bench_ingesta.py [ruta.xlsx] [repeticiones]
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from datos import HOJAS_EXCEL, leer_hojas_excel
+
+
+def leer_por_hoja(contenido):
+    """Réplica del enfoque anterior: un pd.read_excel por hoja sobre el mismo BytesIO"""
+    excel_content = io.BytesIO(contenido)
+    hojas = {}
+    for clave, hoja in HOJAS_EXCEL.items():
+        excel_content.seek(0)
+        hojas[clave] = pd.read_excel(excel_content, sheet_name=hoja)
+    return hojas
+
+
+def medir(funcion, contenido, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(contenido)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos), sum(tiempos) / len(tiempos)
+
+
+def main():
+    ruta = sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "control_obra.xlsx")
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+
+    print(f"Libro: {ruta} ({len(contenido) / 1024:,.0f} KB), {repeticiones} repeticiones")
+    for nombre, funcion in [("hoja por hoja", leer_por_hoja), ("una sola pasada", leer_hojas_excel)]:
+        minimo, promedio = medir(funcion, contenido, repeticiones)
+        print(f"{nombre:>16}: min {minimo:.3f}s | promedio {promedio:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Micro-benchmark de extraer_proyecto: búsqueda anterior (un re.search por proyecto)
+frente al patrón compilado de consultas.construir_matcher_proyectos.
+
+Uso: python benchmarks/bench_matcher.py
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from consultas import construir_matcher_proyectos
+
+SILABAS = ["al", "ba", "ca", "de", "el", "fo", "ga", "li", "lor", "mar", "no", "pe", "ri", "sa", "to", "va"]
+TAMANOS = [10, 100, 1000, 5000]
+CONSULTAS = 200
+
+
+def extraer_proyecto_anterior(projects_map, texto_norm):
+    """Réplica de la implementación anterior"""
+    for norm in sorted(projects_map.keys(), key=len, reverse=True):
+        pattern = rf'(^|\W){re.escape(norm)}($|\W)'
+        if re.search(pattern, texto_norm, flags=re.UNICODE):
+            return projects_map[norm], norm
+    for norm in sorted(projects_map.keys(), key=len, reverse=True):
+        if norm in texto_norm:
+            return projects_map[norm], norm
+    return None, None
+
+
+def nombre_aleatorio(rng):
+    palabras = ["".join(rng.choice(SILABAS) for _ in range(rng.randint(2, 4))) for _ in range(rng.randint(1, 3))]
+    return " ".join(palabras)
+
+
+def medir(funcion, consultas):
+    inicio = time.perf_counter()
+    for consulta in consultas:
+        funcion(consulta)
+    return (time.perf_counter() - inicio) / len(consultas) * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'proyectos':>10} | {'anterior (µs)':>14} | {'compilado (µs)':>14} | {'construcción (ms)':>17}")
+    for tamano in TAMANOS:
+        projects_map = {}
+        while len(projects_map) < tamano:
+            nombre = nombre_aleatorio(rng)
+            projects_map[nombre] = nombre.title()
+        nombres = list(projects_map)
+        consultas = [f"restricciones de materiales en {rng.choice(nombres)}" for _ in range(CONSULTAS // 2)]
+        consultas += ["avance de obra en un proyecto que no existe"] * (CONSULTAS // 2)
+
+        inicio = time.perf_counter()
+        matcher = construir_matcher_proyectos(projects_map)
+        t_construccion = (time.perf_counter() - inicio) * 1000
+
+        t_anterior = medir(lambda c: extraer_proyecto_anterior(projects_map, c), consultas)
+        t_compilado = medir(matcher, consultas)
+        print(f"{tamano:>10} | {t_anterior:>14,.1f} | {t_compilado:>14,.1f} | {t_construccion:>17,.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Micro-benchmark del intérprete de preguntas (consultas.construir_parser) frente a la
+cascada anterior de comprobaciones ``in pregunta_norm``, variando el tamaño del vocabulario.
+
+Uso: python benchmarks/bench_parser.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from consultas import (
+    CARGOS_VALIDOS_NORM, MAPEO_RESTRICCION, construir_matcher_proyectos, construir_parser
+)
+
+PREGUNTAS = [
+    "avance de obra en lorca",
+    "restricciones de materiales en penon de alicante",
+    "residente auxiliar #2 en el castell iberia reservado",
+    "inventario diseno lorca",
+    "sostenibilidad",
+    "cual es el clima hoy en la obra",
+    "problematicas en burdeos",
+]
+CARGOS_EXTRA = [0, 500, 5000]
+REPETICIONES = 2000
+
+
+def cascada_anterior(pregunta_norm, cargos_norm, matcher):
+    """Réplica del enrutado anterior (sin el filtrado de datos)"""
+    matcher(pregunta_norm)
+    if "avance de obra" in pregunta_norm or "avance obra" in pregunta_norm:
+        return 'avance_obra'
+    if "avance en diseno" in pregunta_norm or "avance diseno" in pregunta_norm or "estado diseno" in pregunta_norm or "inventario diseno" in pregunta_norm:
+        return 'avance_diseno'
+    if "responsable" in pregunta_norm or "cargo" in pregunta_norm or any(c in pregunta_norm for c in cargos_norm):
+        for cargo_norm in cargos_norm:
+            if cargo_norm in pregunta_norm:
+                break
+        return 'responsables'
+    if "restriccion" in pregunta_norm or "problema" in pregunta_norm:
+        for keyword in MAPEO_RESTRICCION:
+            if f"restriccion de {keyword}" in pregunta_norm or f"restricciones de {keyword}" in pregunta_norm:
+                break
+        return 'restricciones'
+    if any(k in pregunta_norm for k in ["sostenibilidad", "edge", "sostenible", "ambiental"]):
+        return 'sostenibilidad'
+    return None
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        for pregunta in PREGUNTAS:
+            funcion(pregunta)
+    return (time.perf_counter() - inicio) / (REPETICIONES * len(PREGUNTAS)) * 1e6
+
+
+def main():
+    rng = random.Random(7)
+    projects_map = {"lorca": "Lorca", "penon de alicante": "Peñon de Alicante",
+                    "el castell iberia reservado": "El Castell Iberia Reservado"}
+    matcher = construir_matcher_proyectos(projects_map)
+
+    print(f"{'cargos':>7} | {'cascada (µs)':>12} | {'parser (µs)':>11}")
+    for extra in CARGOS_EXTRA:
+        cargos_norm = dict(CARGOS_VALIDOS_NORM)
+        while len(cargos_norm) < len(CARGOS_VALIDOS_NORM) + extra:
+            nombre = f"cargo{rng.randrange(10**6)} de apoyo {rng.randrange(100)}"
+            cargos_norm[nombre] = nombre.title()
+        interpretar = construir_parser(projects_map, cargos_norm=cargos_norm)
+
+        t_cascada = medir(lambda p: cascada_anterior(p, cargos_norm, matcher))
+        t_parser = medir(interpretar)
+        print(f"{len(cargos_norm):>7} | {t_cascada:>12,.1f} | {t_parser:>11,.1f}")
+
+
+if __name__ == "__main__":
+    main()
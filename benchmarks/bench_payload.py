@@ -0,0 +1,56 @@
+"""Tamaño de lo que app.py envía al navegador en cada rerun: suma de los protos serializados
+de todos los elementos de la página, con los más pesados desglosados.
+
+Ejecuta la vista de chat con streamlit.testing (una carga y un rerun). Para comparar con una
+versión anterior, pasa la ruta de otro app.py.
+
+Uso: python benchmarks/bench_payload.py [ruta/a/app.py] [--top 8]
+"""
+import argparse
+import os
+import sys
+import warnings
+
+from streamlit.testing.v1 import AppTest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def elementos(nodo):
+    """Recorre el árbol de AppTest y devuelve los elementos con proto"""
+    hijos = getattr(nodo, "children", None)
+    if isinstance(hijos, dict):
+        for hijo in hijos.values():
+            yield from elementos(hijo)
+    elif getattr(nodo, "proto", None) is not None:
+        yield nodo
+
+
+def medir(ruta_app):
+    at = AppTest.from_file(os.path.abspath(ruta_app), default_timeout=300)
+    at.run()
+    at.run()
+    tamanos = []
+    for elemento in elementos(at._tree):
+        resumen = str(getattr(elemento, "value", "")).replace("\n", " ")[:60]
+        tamanos.append((len(elemento.proto.SerializeToString()), elemento.type, resumen))
+    return sorted(tamanos, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("app", nargs="?", default=os.path.join(RAIZ, "app.py"))
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    sys.path.insert(0, RAIZ)
+    os.chdir(RAIZ)
+    tamanos = medir(args.app)
+    print(f"Payload por rerun: {sum(t for t, _, _ in tamanos):,} bytes en {len(tamanos)} elementos")
+    for tamano, tipo, resumen in tamanos[:args.top]:
+        print(f"  {tamano:>10,}  {tipo:<12} {resumen}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Throughput del predictor MLP: ruta fila a fila anterior (get_dummies + transform +
+predict_proba + predict por contrato) frente a predictor.puntuar_lote, en filas por segundo,
+y latencia de una predicción del formulario frente a predictor.construir_predictor.
+
+Uso: python benchmarks/bench_predictor.py
+"""
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from predictor import (
+    COLUMNAS_NUMERICAS, OPCIONES_CNC, OPCIONES_PRIORIDAD, OPCIONES_TIPO_CONTRATO,
+    construir_predictor, puntuar_lote,
+)
+
+TAMANOS = [100, 1000, 10000, 100000]
+MAX_FILAS_RUTA_ANTERIOR = 1000
+REPETICIONES_FILA = 20000
+
+
+def lote_sintetico(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'dias_legalizacion_esperados': rng.integers(1, 60, n),
+        'numero_reprogramaciones': rng.integers(0, 8, n),
+        'prioridad': rng.choice(OPCIONES_PRIORIDAD, n),
+        'tipo_contrato': rng.choice(OPCIONES_TIPO_CONTRATO, n),
+        'CNCCompromiso': rng.choice(OPCIONES_CNC, n),
+    })
+
+
+def ruta_anterior(df, modelo, scaler, features):
+    """Réplica de la predicción por formulario aplicada a cada fila"""
+    salida = []
+    for fila in df.to_dict('records'):
+        nuevo_df = pd.get_dummies(pd.DataFrame({k: [v] for k, v in fila.items()}))
+        for col in features:
+            if col not in nuevo_df.columns:
+                nuevo_df[col] = 0
+        nuevo_df = nuevo_df[features]
+        nuevo_df[COLUMNAS_NUMERICAS] = scaler.transform(nuevo_df[COLUMNAS_NUMERICAS])
+        salida.append((modelo.predict_proba(nuevo_df)[0][1], modelo.predict(nuevo_df)[0]))
+    return salida
+
+
+def filas_por_segundo(funcion, df):
+    inicio = time.perf_counter()
+    funcion(df)
+    return len(df) / (time.perf_counter() - inicio)
+
+
+def main():
+    assets = os.path.join(RAIZ, "assets")
+    modelo = joblib.load(os.path.join(assets, "mlp_contratos.joblib"))
+    scaler = joblib.load(os.path.join(assets, "scaler_contratos.joblib"))
+    features = joblib.load(os.path.join(assets, "mlp_features.joblib"))
+
+    print(f"{'filas':>8} {'anterior (filas/s)':>20} {'lote (filas/s)':>16}")
+    for n in TAMANOS:
+        df = lote_sintetico(n)
+        lote = filas_por_segundo(lambda d: puntuar_lote(d, modelo, scaler, features), df)
+        if n <= MAX_FILAS_RUTA_ANTERIOR:
+            anterior = f"{filas_por_segundo(lambda d: ruta_anterior(d, modelo, scaler, features), df):,.0f}"
+        else:
+            anterior = "—"
+        print(f"{n:>8} {anterior:>20} {lote:>16,.0f}")
+
+    fila = lote_sintetico(1)
+    anterior = 1e6 / filas_por_segundo(lambda d: ruta_anterior(d, modelo, scaler, features), fila)
+    predecir = construir_predictor(modelo, scaler, features)
+    argumentos = tuple(fila.iloc[0])
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES_FILA):
+        predecir(*argumentos)
+    compilado = (time.perf_counter() - inicio) / REPETICIONES_FILA * 1e6
+    print(f"\nuna fila: anterior {anterior:,.0f} µs · compilado {compilado:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Envío a Google Sheets contra una hoja falsa en memoria (sin red ni gspread).
+
+Compara llamadas a la API por fila frente a por lote, simula errores de cuota
+(HTTP 429) y comprueba que la bandeja de salida sobrevive a un reinicio.
+
+Uso: python benchmarks/bench_sincronizacion.py [registros] [errores_cuota]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registros import AlmacenRegistros, nuevo_registro
+from sincronizacion import SincronizadorHoja, fila_hoja
+
+
+class ErrorCuota(Exception):
+    """Imita gspread.exceptions.APIError con código 429"""
+    code = 429
+
+
+class HojaFalsa:
+    """Doble local de gspread.Worksheet: guarda las filas y falla por cuota las primeras llamadas"""
+
+    def __init__(self, errores_cuota=0):
+        self.filas = [['id']]
+        self.llamadas = 0
+        self.errores_pendientes = errores_cuota
+
+    def append_rows(self, filas, value_input_option="RAW"):
+        self.llamadas += 1
+        if self.errores_pendientes:
+            self.errores_pendientes -= 1
+            raise ErrorCuota("429 RESOURCE_EXHAUSTED: Quota exceeded")
+        self.filas.extend(filas)
+
+    def col_values(self, columna):
+        return [fila[columna - 1] for fila in self.filas]
+
+
+def esperar_vacio(almacen, limite=30.0):
+    fin = time.monotonic() + limite
+    while almacen.contar_pendientes() and time.monotonic() < fin:
+        time.sleep(0.01)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    errores = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        almacen = AlmacenRegistros(os.path.join(cache_dir, "registros.sqlite3"))
+        almacen.insertar_lote([
+            nuevo_registro('novedad', {'proyecto': f"Proyecto {i % 20}", 'urgencia': "Alta", 'descripcion': f"n{i}"})
+            for i in range(n)
+        ])
+
+        por_fila = HojaFalsa()
+        for id_, registro in almacen.pendientes_sincronizar(n):
+            por_fila.append_rows([fila_hoja(id_, registro)])
+        print(f"Por fila: {por_fila.llamadas:,} llamadas a la API para {n:,} registros")
+
+        # Primera ejecución: se detiene con la mitad aún en la bandeja de salida
+        hoja = HojaFalsa(errores_cuota=errores)
+        sincronizador = SincronizadorHoja(almacen, lambda: hoja, max_lote=500, espera_base=0.05, espera_max=1.0)
+        inicio = time.perf_counter()
+        while len(hoja.filas) - 1 < n // 2:
+            time.sleep(0.01)
+        sincronizador.detener()
+        print(f"Antes del reinicio: {len(hoja.filas) - 1:,} filas enviadas, "
+              f"{almacen.contar_pendientes():,} pendientes en la base local")
+
+        # Reinicio: un almacén y un sincronizador nuevos retoman lo pendiente
+        almacen = AlmacenRegistros(os.path.join(cache_dir, "registros.sqlite3"))
+        sincronizador = SincronizadorHoja(almacen, lambda: hoja, max_lote=500, espera_base=0.05, espera_max=1.0)
+        esperar_vacio(almacen)
+        transcurrido = time.perf_counter() - inicio
+        sincronizador.detener()
+
+        ids = [fila[0] for fila in hoja.filas[1:]]
+        print(f"Por lote: {hoja.llamadas} llamadas ({errores} rechazadas por cuota) en {transcurrido:.2f} s")
+        print(f"Filas en la hoja: {len(ids):,} · únicas: {len(set(ids)):,} · pendientes: {almacen.contar_pendientes()}")
+
+
+if __name__ == "__main__":
+    main()
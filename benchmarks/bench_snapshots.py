@@ -0,0 +1,40 @@
+"""Compara la lectura del .xlsx con la lectura del snapshot Feather de la misma versión.
+
+Uso: python benchmarks/bench_snapshots.py [ruta.xlsx]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datos import PYARROW_AVAILABLE, escribir_snapshot, leer_hojas_excel, leer_snapshot, version_datos
+
+
+def main():
+    if not PYARROW_AVAILABLE:
+        sys.exit("pyarrow no está instalado")
+    ruta = sys.argv[1] if len(sys.argv) > 1 else os.path.join("data", "control_obra.xlsx")
+    with open(ruta, "rb") as f:
+        contenido = f.read()
+    version = version_datos(contenido)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        inicio = time.perf_counter()
+        hojas = leer_hojas_excel(contenido)
+        t_xlsx = time.perf_counter() - inicio
+
+        if not escribir_snapshot(version, hojas, cache_dir):
+            sys.exit("No se pudo escribir el snapshot (tipos no compatibles con Arrow)")
+
+        inicio = time.perf_counter()
+        leer_snapshot(version, cache_dir)
+        t_snapshot = time.perf_counter() - inicio
+
+    print(f"xlsx (openpyxl): {t_xlsx * 1000:,.1f} ms")
+    print(f"snapshot Feather: {t_snapshot * 1000:,.1f} ms ({t_xlsx / t_snapshot:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
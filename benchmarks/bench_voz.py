@@ -0,0 +1,80 @@
+"""Latencia de la consulta por voz por segundo de audio: decodificación y
+remuestreo a 16 kHz y, si el modelo Whisper está disponible, transcripción en CPU.
+
+Uso: python benchmarks/bench_voz.py [clip.wav] [--repeticiones N]
+Sin clip se usan señales sintéticas a 48 kHz (frecuencia habitual del navegador);
+para medir la transcripción conviene pasar una grabación real con voz.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from voz import DIR_MODELOS_WHISPER, FRECUENCIA_WHISPER, TranscriptorVoz, leer_wav, preparar_audio, ruta_modelo
+
+DURACIONES = (1, 5, 10, 30)
+FRECUENCIA_SINTETICA = 48000
+
+
+def wav_sintetico(segundos, frecuencia=FRECUENCIA_SINTETICA):
+    from scipy.io import wavfile
+
+    rng = np.random.default_rng(0)
+    senal = (rng.normal(0, 0.1, int(segundos * frecuencia)) * 32767).astype(np.int16)
+    salida = io.BytesIO()
+    wavfile.write(salida, frecuencia, senal)
+    return salida.getvalue()
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("clip", nargs="?", help="WAV con una consulta hablada")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.clip:
+        with open(args.clip, "rb") as f:
+            contenido = f.read()
+        senal, frecuencia = leer_wav(contenido)
+        clips = [(len(senal) / frecuencia, contenido)]
+    else:
+        clips = [(segundos, wav_sintetico(segundos)) for segundos in DURACIONES]
+
+    print(f"Preparación (WAV -> mono {FRECUENCIA_WHISPER // 1000} kHz):")
+    for segundos, contenido in clips:
+        t = medir(lambda: preparar_audio(contenido), args.repeticiones)
+        print(f"  {segundos:5.1f} s de audio: {t * 1000:8.2f} ms ({t / segundos * 1000:.2f} ms por segundo)")
+
+    ruta = ruta_modelo()
+    if ruta is None:
+        print(f"\nWhisper no disponible (paquete o pesos en {DIR_MODELOS_WHISPER}); se omite la transcripción.")
+        return
+
+    transcriptor = TranscriptorVoz(ruta)
+    inicio = time.perf_counter()
+    transcriptor.modelo()
+    print(f"\nCarga del modelo ({os.path.basename(ruta)}, una vez por proceso): {time.perf_counter() - inicio:.2f} s")
+    print("Transcripción en CPU:")
+    for segundos, contenido in clips:
+        senal = preparar_audio(contenido)
+        texto = transcriptor.transcribir(senal)
+        t = medir(lambda: transcriptor.transcribir(senal), args.repeticiones)
+        print(f"  {segundos:5.1f} s de audio: {t:6.2f} s ({t / segundos:.2f} s por segundo de audio) -> {texto[:60]!r}")
+
+
+if __name__ == "__main__":
+    main()
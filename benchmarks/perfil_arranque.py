@@ -0,0 +1,101 @@
+"""Informe de arranque en frío de app.py: tiempo de importación por módulo (``-X importtime``)
+y tiempo por sección de nivel superior (perfil.TIEMPOS_SECCION).
+
+Ejecuta la app una vez con streamlit.testing en un proceso nuevo. Los módulos que ya importa
+el propio runtime de Streamlit no se cuentan. Con --json se guarda el informe para comparar
+entre versiones.
+
+Uso: python benchmarks/perfil_arranque.py [--top 15] [--prediccion] [--cache-vacia] [--json ruta]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from perfil import leer_importtime
+
+MARCA = "--- inicio de app.py ---"
+
+RUNNER = """
+import json, sys, time, warnings
+warnings.simplefilter('ignore')
+sys.path.insert(0, {raiz!r})
+from streamlit.testing.v1 import AppTest
+import perfil
+sys.stderr.write({marca!r} + '\\n')
+sys.stderr.flush()
+inicio = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=600)
+at.run()
+resultado = {{'primera_ejecucion': time.perf_counter() - inicio, 'secciones': dict(perfil.TIEMPOS_SECCION)}}
+if {prediccion!r}:
+    at.session_state['current_view'] = 'predictor'
+    inicio = time.perf_counter()
+    at.run()
+    resultado['entrada_prediccion'] = time.perf_counter() - inicio
+    for nombre, segundos in perfil.TIEMPOS_SECCION.items():
+        resultado['secciones'].setdefault(nombre, segundos)
+resultado['excepciones'] = [str(e.value) for e in at.exception]
+print(json.dumps(resultado))
+"""
+
+
+def perfilar(prediccion=False, cache_vacia=False):
+    entorno = dict(os.environ)
+    with tempfile.TemporaryDirectory() as carpeta:
+        if cache_vacia:
+            entorno["MAR_CACHE_DIR"] = carpeta
+        codigo = RUNNER.format(raiz=RAIZ, marca=MARCA, app=os.path.join(RAIZ, "app.py"), prediccion=prediccion)
+        proceso = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", codigo],
+            cwd=RAIZ, env=entorno, capture_output=True, text=True
+        )
+    if proceso.returncode != 0:
+        raise RuntimeError(proceso.stderr[-2000:])
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    _, _, importaciones_app = proceso.stderr.partition(MARCA)
+    resultado['importaciones'] = [
+        {'modulo': modulo, 'propio_ms': propio / 1000, 'acumulado_ms': acumulado / 1000}
+        for modulo, propio, acumulado, nivel in leer_importtime(importaciones_app) if nivel == 0
+    ]
+    return resultado
+
+
+def imprimir(resultado, top):
+    importaciones = sorted(resultado['importaciones'], key=lambda i: i['acumulado_ms'], reverse=True)
+    print(f"Primera ejecución de app.py: {resultado['primera_ejecucion'] * 1000:,.0f} ms")
+    if 'entrada_prediccion' in resultado:
+        print(f"Entrada a la vista de previsión: {resultado['entrada_prediccion'] * 1000:,.0f} ms")
+    total_importaciones = sum(i['acumulado_ms'] for i in importaciones)
+    print(f"\nImportaciones ({total_importaciones:,.0f} ms en {len(importaciones)} módulos de primer nivel)")
+    for i in importaciones[:top]:
+        print(f"  {i['modulo']:<40} {i['acumulado_ms']:>10,.1f} ms")
+    print("\nSecciones")
+    for nombre, segundos in resultado['secciones'].items():
+        print(f"  {nombre:<40} {segundos * 1000:>10,.1f} ms")
+    if resultado['excepciones']:
+        print("\nExcepciones:", *resultado['excepciones'], sep="\n  ")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top", type=int, default=15, help="módulos a listar")
+    parser.add_argument("--prediccion", action="store_true", help="entra también en la vista de previsión (carga del MLP)")
+    parser.add_argument("--cache-vacia", action="store_true", help="sin snapshots ni copia del Excel en disco")
+    parser.add_argument("--json", help="guarda el informe completo en esta ruta")
+    args = parser.parse_args()
+
+    resultado = perfilar(prediccion=args.prediccion, cache_vacia=args.cache_vacia)
+    imprimir(resultado, args.top)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""Interpretación de las consultas del chat (sin dependencias de Streamlit)."""
+import re
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+
+from datos import normalizar_texto, quitar_tildes
+
+# Pregunta ya interpretada; es la clave de la caché de respuestas (junto con la versión de los datos)
+Consulta = namedtuple("Consulta", ["intencion", "proyecto", "proyecto_norm", "cargo", "tipos_restriccion"])
+
+# -----------------------------
+# VOCABULARIO DE LAS CONSULTAS
+# -----------------------------
+CARGOS_VALIDOS = [
+    "Analista de compras", "Analista de Programación", "Arquitecto",
+    "Contralor de proyectos", "Coordinador Administrativo de Proyectos", "Coordinador BIM",
+    "Coordinador Eléctrico", "Coordinador Logístico", "Coordinador SIG", "Coordinadora de pilotaje",
+    "Director de compras", "Director de obra", "Director Nacional Lean y BIM", "Director Técnico",
+    "Diseñador estructural", "Diseñador externo", "Equipo MARVAL", "Gerente de proyectos",
+    "Ingeniera Eléctrica", "Ingeniero Ambiental", "Ingeniero de Contratación", "Ingeniero electromecánico",
+    "Ingeniero FCA", "Ingeniero FCA #2", "Ingeniero Lean", "Ingeniero Lean 3", "Profesional SYST",
+    "Programador de obra", "Programador de obra #2", "Practicante de Interventoría #1",
+    "Practicante Lean", "Residente", "Residente #2", "Residente Administrativo de Equipos",
+    "Residente auxiliar", "Residente Auxiliar #2", "Residente Auxiliar #3", "Residente Auxiliar #4",
+    "Residente de acabados", "Residente de acabados #2", "Residente de control e interventoría",
+    "Residente de Equipos", "Residente de supervisión técnica", "Residente logístico", "Técnico de almacén"
+]
+CARGOS_VALIDOS_NORM = {quitar_tildes(normalizar_texto(c)): c for c in CARGOS_VALIDOS}
+
+MAPEO_RESTRICCION = {
+    "material": "Materiales",
+    "materiales": "Materiales",
+    "diseno": "Diseño",
+    "diseño": "Diseño",
+    "contrato": "Contratos",
+    "contratos": "Contratos",
+    "permisos": "Permisos y Licencias",
+    "licencias": "Permisos y Licencias",
+    "financiero": "Financiera",
+    "financiera": "Financiera"
+}
+
+# Frases que activan cada intención, en orden de precedencia. Se buscan como
+# subcadenas: "responsable" también cubre "responsables" y "problema", "problematicas"
+FRASES_INTENCION = {
+    'avance_obra': ["avance de obra", "avance obra"],
+    'avance_diseno': ["avance en diseno", "avance diseno", "estado diseno", "inventario diseno"],
+    'responsables': ["responsable", "cargo"],
+    'restricciones': ["restriccion", "problema"],
+    'sostenibilidad': ["sostenibilidad", "edge", "sostenible", "ambiental"],
+}
+
+
+# -----------------------------
+# DETECCIÓN DE PROYECTOS EN LA CONSULTA
+# -----------------------------
+def _patron_trie(palabras):
+    """Alternancia factorizada por prefijos (trie) de las palabras dadas.
+
+    En cada posición solo una rama puede avanzar, y los finales opcionales son
+    codiciosos, así que la expresión prefiere siempre la coincidencia más larga.
+    """
+    trie = {}
+    for palabra in palabras:
+        nodo = trie
+        for caracter in palabra:
+            nodo = nodo.setdefault(caracter, {})
+        nodo[''] = {}
+
+    def a_regex(nodo):
+        ramas = [re.escape(c) + a_regex(hijo) for c, hijo in sorted(nodo.items()) if c]
+        if not ramas:
+            return ''
+        cuerpo = ramas[0] if len(ramas) == 1 else '(?:' + '|'.join(ramas) + ')'
+        return f'(?:{cuerpo})?' if '' in nodo else cuerpo
+
+    return a_regex(trie)
+
+
+def construir_matcher_proyectos(projects_map):
+    """Compila una sola vez (por versión de los datos) el buscador de proyectos.
+
+    Devuelve una función que recibe la consulta ya normalizada y retorna
+    ``(proyecto, proyecto_norm)`` con el nombre más largo mencionado como palabra
+    completa; si no hay ninguno, el más largo contenido como subcadena; si
+    tampoco, ``(None, None)``.
+    """
+    nombres = [norm for norm in projects_map if norm]
+    if not nombres:
+        return lambda texto_norm: (None, None)
+
+    trie = _patron_trie(nombres)
+    # La búsqueda anticipada de ancho cero permite coincidencias solapadas en una sola pasada
+    patron_palabra = re.compile(rf'(?<!\w)(?=({trie})(?!\w))', flags=re.UNICODE)
+    patron_subcadena = re.compile(rf'(?=({trie}))', flags=re.UNICODE)
+
+    def extraer(texto_norm):
+        for patron in (patron_palabra, patron_subcadena):
+            norm = max((m.group(1) for m in patron.finditer(texto_norm)), key=len, default=None)
+            if norm:
+                return projects_map[norm], norm
+        return None, None
+
+    return extraer
+
+
+# -----------------------------
+# INTERPRETACIÓN DE LA PREGUNTA
+# -----------------------------
+def _es_palabra(caracter):
+    # Igual que \w en las expresiones del buscador de proyectos
+    return caracter.isalnum() or caracter == '_'
+
+
+def construir_parser(projects_map, cargos_norm=CARGOS_VALIDOS_NORM,
+                     mapeo_restriccion=MAPEO_RESTRICCION, frases_intencion=FRASES_INTENCION):
+    """Construye, una vez por versión de los datos, el intérprete de preguntas.
+
+    Enruta igual que la cascada de comprobaciones ``in pregunta_norm``: las frases
+    de intención, los cargos, los tipos de restricción y los proyectos se buscan
+    como subcadenas, pero todos a la vez con una sola expresión (trie) en lugar de
+    una pasada por término. Cada término guarda además lo que aportan los términos
+    que son prefijo suyo, así que basta con la coincidencia más larga en cada
+    posición. El proyecto se elige como en ``construir_matcher_proyectos``.
+
+    Devuelve una función ``interpretar(pregunta_norm) -> Consulta``.
+    """
+    precedencia = {intencion: orden for orden, intencion in enumerate(frases_intencion)}
+    intenciones = list(frases_intencion)
+    sin_intencion = len(intenciones)
+    cargos = list(cargos_norm.values())
+    tipos = list(mapeo_restriccion.values())
+
+    # término -> [(clase, valor)]; en intenciones, cargos y tipos el valor es su
+    # posición, que reproduce la prioridad de la cascada anterior
+    vocabulario = {}
+    for intencion, frases in frases_intencion.items():
+        for frase in frases:
+            vocabulario.setdefault(frase, []).append(('intencion', precedencia[intencion]))
+    for orden, cargo_norm in enumerate(cargos_norm):
+        vocabulario.setdefault(cargo_norm, []).append(('cargo', orden))
+    for orden, keyword in enumerate(mapeo_restriccion):
+        for frase in (f"restriccion de {keyword}", f"restricciones de {keyword}"):
+            vocabulario.setdefault(frase, []).append(('tipo_restriccion', orden))
+    for proyecto_norm in projects_map:
+        if proyecto_norm:
+            vocabulario.setdefault(proyecto_norm, []).append(('proyecto', proyecto_norm))
+
+    # término -> (mejor intención, mejor cargo, tipos, proyectos) sumando sus prefijos que también son términos
+    resumen = {}
+    for termino in vocabulario:
+        orden_intencion, orden_cargo, ordenes_tipo, proyectos = sin_intencion, len(cargos), frozenset(), ()
+        for largo in range(1, len(termino) + 1):
+            for clase, valor in vocabulario.get(termino[:largo], ()):
+                if clase == 'intencion':
+                    orden_intencion = min(orden_intencion, valor)
+                elif clase == 'cargo':
+                    orden_cargo = min(orden_cargo, valor)
+                elif clase == 'tipo_restriccion':
+                    ordenes_tipo = ordenes_tipo | {valor}
+                else:
+                    proyectos = (valor,) + proyectos
+        resumen[termino] = (orden_intencion, orden_cargo, ordenes_tipo, proyectos)
+
+    # La búsqueda anticipada de ancho cero prueba cada posición, con coincidencias solapadas
+    patron = re.compile(f'(?=({_patron_trie(vocabulario)}))', flags=re.UNICODE)
+
+    def interpretar(pregunta_norm):
+        orden_intencion, orden_cargo, ordenes_tipo = sin_intencion, len(cargos), set()
+        # Nombre más largo como palabra completa y, en su defecto, como subcadena
+        en_palabra, en_subcadena = '', ''
+        for coincidencia in patron.finditer(pregunta_norm):
+            intencion_termino, cargo_termino, tipos_termino, proyectos = resumen[coincidencia.group(1)]
+            orden_intencion = min(orden_intencion, intencion_termino)
+            orden_cargo = min(orden_cargo, cargo_termino)
+            ordenes_tipo.update(tipos_termino)
+            inicio = coincidencia.start()
+            for proyecto_norm in proyectos:
+                if len(proyecto_norm) > len(en_subcadena):
+                    en_subcadena = proyecto_norm
+                if len(proyecto_norm) > len(en_palabra):
+                    fin = inicio + len(proyecto_norm)
+                    if not ((inicio and _es_palabra(pregunta_norm[inicio - 1]))
+                            or (fin < len(pregunta_norm) and _es_palabra(pregunta_norm[fin]))):
+                        en_palabra = proyecto_norm
+
+        # Mencionar un cargo equivale a preguntar por responsables
+        if orden_cargo < len(cargos):
+            orden_intencion = min(orden_intencion, precedencia['responsables'])
+        intencion = intenciones[orden_intencion] if orden_intencion < sin_intencion else None
+        if intencion == 'avance_diseno' and 'inventario' in pregunta_norm:
+            intencion = 'inventario_diseno'
+        cargo = cargos[orden_cargo] if intencion == 'responsables' and orden_cargo < len(cargos) else None
+        tipos_restriccion = ()
+        if intencion == 'restricciones':
+            tipos_restriccion = tuple(dict.fromkeys(tipos[orden] for orden in sorted(ordenes_tipo)))
+
+        proyecto_norm = en_palabra or en_subcadena or None
+        proyecto = projects_map[proyecto_norm] if proyecto_norm else None
+        return Consulta(intencion, proyecto, proyecto_norm, cargo, tipos_restriccion)
+
+    return interpretar
+
+
+# -----------------------------
+# CACHÉ LRU DE RESPUESTAS
+# -----------------------------
+def tamano_aproximado(valor):
+    """Bytes aproximados de un valor guardado en caché.
+
+    Tablas por ``memory_usage(deep=True)``, arreglos por ``nbytes``, figuras
+    Plotly por sus datos y contenedores sumando sus elementos. Dos respuestas que
+    comparten la misma tabla la cuentan dos veces: la cota peca de prudente.
+    """
+    if valor is None:
+        return 0
+    if hasattr(valor, 'memory_usage'):
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum()) if hasattr(uso, 'sum') else int(uso)
+    if hasattr(valor, 'nbytes'):
+        return int(valor.nbytes)
+    if hasattr(valor, 'to_plotly_json'):
+        return tamano_aproximado(valor.to_plotly_json())
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamano_aproximado(k) + tamano_aproximado(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple, set, frozenset)):
+        return sys.getsizeof(valor) + sum(tamano_aproximado(elemento) for elemento in valor)
+    return sys.getsizeof(valor)
+
+
+class CacheLRU:
+    """Caché LRU acotada en memoria, segura entre hilos y ligada a una versión de los datos.
+
+    La cota es en bytes (``max_bytes``, medidos con ``medir``) y no en número
+    de entradas: una respuesta con la hoja completa de restricciones ocupa miles
+    de veces más que una con diez filas. Un valor mayor que la cota no se guarda.
+    Al llegar una versión distinta se vacía por completo, de modo que nunca se
+    sirven respuestas calculadas con datos anteriores.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20, medir=tamano_aproximado):
+        self.max_bytes = max_bytes
+        self._medir = medir
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _vaciar(self):
+        self._entradas.clear()
+        self._bytes = 0
+
+    def _sincronizar_version(self, version):
+        if version != self._version:
+            self._vaciar()
+            self._version = version
+
+    def obtener_o_calcular(self, version, clave, calcular):
+        """Devuelve el valor guardado para ``clave`` o lo calcula con ``calcular()``"""
+        with self._lock:
+            self._sincronizar_version(version)
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._entradas[clave][0]
+            self.fallos += 1
+
+        # El cálculo (y su medida) se hace fuera del lock para no bloquear otras sesiones
+        valor = calcular()
+        tamano = self._medir(valor)
+
+        with self._lock:
+            if version == self._version and tamano <= self.max_bytes:
+                anterior = self._entradas.pop(clave, None)
+                if anterior is not None:
+                    self._bytes -= anterior[1]
+                self._entradas[clave] = (valor, tamano)
+                self._bytes += tamano
+                while self._bytes > self.max_bytes:
+                    _, (_, liberado) = self._entradas.popitem(last=False)
+                    self._bytes -= liberado
+        return valor
+
+    def invalidar(self):
+        with self._lock:
+            self._vaciar()
+
+    def estadisticas(self):
+        with self._lock:
+            return {'aciertos': self.aciertos, 'fallos': self.fallos, 'entradas': len(self._entradas),
+                    'bytes': self._bytes}
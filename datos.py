@@ -0,0 +1,393 @@
+"""Carga y preparación de los datos de control de obra (sin dependencias de Streamlit)."""
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import unicodedata
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Snapshots columnares (Feather/Arrow) opcionales
+try:
+    import pyarrow.feather as feather
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# -----------------------------
+# RUTAS Y PARÁMETROS DE DESCARGA
+# -----------------------------
+CACHE_DIR = os.environ.get("MAR_CACHE_DIR", ".cache")
+# Registros y fotos capturados en la app: no son caché y no deben borrarse con ella
+DATOS_DIR = os.environ.get("MAR_DATOS_DIR", "datos_app")
+EXCEL_LOCAL_PATH = os.path.join("data", "control_obra.xlsx")
+TIMEOUT_DESCARGA = (5, 30)  # (conexión, lectura) en segundos
+
+# -----------------------------
+# HOJAS DEL LIBRO control_obra.xlsx
+# -----------------------------
+# Clave interna -> nombre de la hoja en el libro
+HOJAS_EXCEL = {
+    'avance': "Avance",
+    'responsables': "Responsables",
+    'restricciones': "Restricciones",
+    'sostenibilidad': "Sostenibilidad",
+    'avance_diseno': "AvanceDiseño",
+    'inventario_diseno': "InventarioDiseño",
+}
+
+
+def leer_hojas_excel(contenido):
+    """Abre el libro una sola vez y materializa todas las hojas necesarias.
+
+    El contenedor zip, los estilos y la tabla de cadenas compartidas se leen una
+    única vez; cada hoja se recorre en modo streaming (openpyxl en solo lectura).
+    """
+    with pd.ExcelFile(io.BytesIO(contenido), engine="openpyxl") as libro:
+        return {clave: libro.parse(hoja) for clave, hoja in HOJAS_EXCEL.items()}
+
+
+# -----------------------------
+# SNAPSHOTS COLUMNARES POR VERSIÓN DEL LIBRO
+# -----------------------------
+def version_datos(contenido):
+    """Huella SHA-256 del libro descargado; identifica la versión de los datos"""
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def _carpeta_snapshots(cache_dir):
+    return os.path.join(cache_dir, "snapshots")
+
+
+def leer_snapshot(version, cache_dir=CACHE_DIR):
+    """Lee las hojas de un snapshot Feather mapeado en memoria, o None si no existe"""
+    if not PYARROW_AVAILABLE:
+        return None
+    carpeta = os.path.join(_carpeta_snapshots(cache_dir), version)
+    if not os.path.isdir(carpeta):
+        return None
+    try:
+        return {
+            clave: feather.read_table(os.path.join(carpeta, f"{clave}.feather"), memory_map=True).to_pandas()
+            for clave in HOJAS_EXCEL
+        }
+    except Exception:
+        # Snapshot corrupto o incompleto: se descarta y se vuelve a generar
+        shutil.rmtree(carpeta, ignore_errors=True)
+        return None
+
+
+def escribir_snapshot(version, hojas, cache_dir=CACHE_DIR):
+    """Guarda las hojas como Feather sin comprimir (se pueden mapear en memoria).
+
+    Se escribe en una carpeta temporal que se renombra al final, de modo que un
+    snapshot visible siempre está completo. Los snapshots de otras versiones se eliminan.
+    """
+    if not PYARROW_AVAILABLE:
+        return False
+    base = _carpeta_snapshots(cache_dir)
+    carpeta = os.path.join(base, version)
+    temporal = f"{carpeta}.tmp"
+    try:
+        shutil.rmtree(temporal, ignore_errors=True)
+        os.makedirs(temporal)
+        for clave, df in hojas.items():
+            feather.write_feather(df, os.path.join(temporal, f"{clave}.feather"), compression="uncompressed")
+        shutil.rmtree(carpeta, ignore_errors=True)
+        os.replace(temporal, carpeta)
+    except Exception:
+        # Columnas con tipos mezclados que Arrow no admite: se sigue leyendo el .xlsx
+        shutil.rmtree(temporal, ignore_errors=True)
+        return False
+
+    for nombre in os.listdir(base):
+        if nombre != version:
+            shutil.rmtree(os.path.join(base, nombre), ignore_errors=True)
+    return True
+
+
+def cargar_hojas(contenido, cache_dir=CACHE_DIR, version=None):
+    """Devuelve ``(hojas, version)`` usando el snapshot de esa versión si ya existe.
+
+    Solo la primera carga de una versión nueva del libro pasa por openpyxl.
+    """
+    version = version or version_datos(contenido)
+    hojas = leer_snapshot(version, cache_dir)
+    if hojas is None:
+        hojas = leer_hojas_excel(contenido)
+        escribir_snapshot(version, hojas, cache_dir)
+    return hojas, version
+
+
+# -----------------------------
+# NORMALIZACIÓN DE TEXTO
+# -----------------------------
+def normalizar_texto(texto):
+    texto = str(texto).lower()
+    texto = re.sub(r"[.,;:%]", "", texto)
+    texto = re.sub(r"\s+", " ", texto)
+    return texto.strip()
+
+
+def quitar_tildes(texto):
+    return ''.join(c for c in unicodedata.normalize('NFD', texto) if unicodedata.category(c) != 'Mn')
+
+
+def normalizar_serie(serie):
+    """Equivale a ``quitar_tildes(normalizar_texto(x))`` por fila, pero normaliza
+    cada valor distinto una sola vez y expande el resultado con los códigos."""
+    codigos, unicos = pd.factorize(serie.astype(str))
+    normalizados = np.array([quitar_tildes(normalizar_texto(v)) for v in unicos], dtype=object)
+    return pd.Series(normalizados[codigos], index=serie.index, name=serie.name)
+
+
+def preparar_hojas(hojas):
+    """Agrega 'Proyecto_norm' a cada hoja y construye el mapa de proyectos.
+
+    Se ejecuta una vez por versión de los datos; las hojas devueltas se comparten
+    entre sesiones y no deben modificarse.
+    """
+    preparadas = {}
+    proyectos = {}  # nombres distintos en orden de aparición
+    for clave, df in hojas.items():
+        if "Proyecto" in df.columns:
+            proyecto_str = df["Proyecto"].astype(str)
+            preparadas[clave] = df.assign(Proyecto_norm=normalizar_serie(proyecto_str))
+            proyectos.update(dict.fromkeys(proyecto_str.unique()))
+        else:
+            preparadas[clave] = df.assign(Proyecto_norm="")
+
+    if 'restricciones' in preparadas:
+        preparadas['restricciones'] = preparar_fechas_restricciones(preparadas['restricciones'])
+
+    projects_map = {quitar_tildes(normalizar_texto(p)): p for p in proyectos}
+    return preparadas, projects_map
+
+
+# -----------------------------
+# FECHAS DE COMPROMISO DE LAS RESTRICCIONES
+# -----------------------------
+# Formatos aceptados para fechas escritas como texto en el libro, en orden de prueba
+FORMATOS_FECHA = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d/%m/%Y")
+
+
+def a_fecha(serie):
+    """Convierte una columna a datetime64 probando solo los formatos de FORMATOS_FECHA.
+
+    Las celdas de fecha de Excel ya llegan como datetime64 y se devuelven tal cual;
+    lo que no encaja en ningún formato queda como NaT.
+    """
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    texto = serie.astype(str).where(serie.notna())
+    fechas = pd.Series(pd.NaT, index=serie.index, dtype="datetime64[ns]")
+    for formato in FORMATOS_FECHA:
+        pendientes = fechas.isna() & texto.notna()
+        if not pendientes.any():
+            break
+        fechas[pendientes] = pd.to_datetime(texto[pendientes], format=formato, errors="coerce")
+    return fechas
+
+
+def preparar_fechas_restricciones(df):
+    """Tipa FechaCompromisoInicial/Actual y calcula DiasDiferencia una sola vez al cargar"""
+    columnas = ["FechaCompromisoActual", "FechaCompromisoInicial"]
+    if not all(col in df.columns for col in columnas):
+        return df.assign(DiasDiferencia=pd.NA)
+    actual = a_fecha(df["FechaCompromisoActual"])
+    inicial = a_fecha(df["FechaCompromisoInicial"])
+    return df.assign(
+        FechaCompromisoActual=actual,
+        FechaCompromisoInicial=inicial,
+        DiasDiferencia=(actual - inicial).dt.days,
+    )
+
+
+# -----------------------------
+# CUBO DE INDICADORES DE RESTRICCIONES
+# -----------------------------
+TODOS = "*"  # clave de los totales en cualquiera de las dos dimensiones del cubo
+
+_COLUMNAS_CUBO = ['restricciones', 'con_fechas', 'reprogramadas', 'dias_retraso']
+
+
+def construir_cubo_restricciones(df):
+    """Agrega la hoja de restricciones por (Proyecto_norm, tipoRestriccion) con sus totales.
+
+    Cada fila del cubo tiene el número de restricciones, las que tienen ambas
+    fechas, las reprogramadas (DiasDiferencia > 0), la suma y el promedio de días
+    de retraso de las reprogramadas. Los totales usan ``TODOS`` como proyecto y/o
+    tipo. Se construye una vez por versión de los datos.
+    """
+    dias = pd.to_numeric(df["DiasDiferencia"], errors="coerce") if "DiasDiferencia" in df.columns else pd.Series(np.nan, index=df.index)
+    tipo = df["tipoRestriccion"] if "tipoRestriccion" in df.columns else pd.Series(np.nan, index=df.index, dtype=object)
+    base = pd.DataFrame({
+        'proyecto': df["Proyecto_norm"],
+        'tipo': tipo,
+        'restricciones': 1,
+        'con_fechas': dias.notna().astype(int),
+        'reprogramadas': (dias > 0).astype(int),
+        'dias_retraso': dias.where(dias > 0, 0.0),
+    })
+
+    # Totales: la misma agregación con una o ambas dimensiones colapsadas en TODOS
+    niveles = [base, base.assign(tipo=TODOS), base.assign(proyecto=TODOS), base.assign(proyecto=TODOS, tipo=TODOS)]
+    # dropna=False: las filas sin proyecto o sin tipo cuentan en los totales, como en la hoja
+    cubo = pd.concat([
+        nivel.groupby(['proyecto', 'tipo'], dropna=False)[_COLUMNAS_CUBO].sum() for nivel in niveles
+    ]).sort_index()
+    cubo['promedio_dias_retraso'] = cubo['dias_retraso'] / cubo['reprogramadas'].where(cubo['reprogramadas'] > 0)
+    return cubo
+
+
+def kpis_restricciones(cubo, proyecto_norm=None, tipo=None):
+    """Fila del cubo para un proyecto y tipo (None = todos), o None si no hay restricciones"""
+    try:
+        return cubo.loc[(proyecto_norm or TODOS, tipo or TODOS)]
+    except KeyError:
+        return None
+
+
+def conteo_por_tipo(cubo, proyecto_norm=None):
+    """Restricciones por tipo de un proyecto (o de todos) en columnas tipoRestriccion / count"""
+    try:
+        filas = cubo.xs(proyecto_norm or TODOS, level='proyecto')
+    except KeyError:
+        return pd.DataFrame({'tipoRestriccion': [], 'count': []})
+    conteo = filas['restricciones'].drop(TODOS, errors='ignore')
+    # Sin tipo no hay barra, aunque esas filas sí cuentan en los totales
+    conteo = conteo[conteo.index.notna()]
+    return conteo.rename_axis('tipoRestriccion').reset_index(name='count')
+
+
+# -----------------------------
+# ÍNDICE DE FILAS POR PROYECTO
+# -----------------------------
+_SIN_FILAS = np.empty(0, dtype=np.intp)
+
+
+def indexar_por_proyecto(hojas):
+    """Para cada hoja, posiciones de fila de cada proyecto normalizado"""
+    return {
+        clave: df.groupby("Proyecto_norm", sort=False).indices
+        for clave, df in hojas.items()
+    }
+
+
+def filtrar_proyecto(df, indice, proyecto_norm):
+    """Filas del proyecto tomadas del índice precalculado (O(k) en vez de recorrer la hoja).
+
+    Sin proyecto devuelve la hoja compartida tal cual: quien la reciba no debe modificarla.
+    """
+    if not proyecto_norm:
+        return df
+    return df.take(indice.get(proyecto_norm, _SIN_FILAS))
+
+
+# -----------------------------
+# DESCARGA CONDICIONAL CON CACHÉ EN DISCO
+# -----------------------------
+_sesion_http = None
+
+
+def obtener_sesion():
+    """Devuelve la sesión HTTP compartida (pool de conexiones y reintentos acotados)"""
+    global _sesion_http
+    if _sesion_http is None:
+        reintentos = Retry(
+            total=3,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "HEAD"]),
+        )
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=reintentos)
+        sesion = requests.Session()
+        sesion.mount("https://", adaptador)
+        sesion.mount("http://", adaptador)
+        _sesion_http = sesion
+    return _sesion_http
+
+
+def _leer_json(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _escribir_atomico(ruta, contenido):
+    """Escribe en un temporal y lo renombra para no dejar archivos a medias"""
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = f"{ruta}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def _leer_bytes(ruta):
+    with open(ruta, "rb") as f:
+        return f.read()
+
+
+def _es_xlsx(ruta):
+    """True si el archivo existe y empieza como un zip (un .xlsx); una copia dañada no cuenta"""
+    try:
+        with open(ruta, "rb") as f:
+            return f.read(2) == b"PK"
+    except OSError:
+        return False
+
+
+def descargar_excel(url, cache_dir=CACHE_DIR, respaldo=EXCEL_LOCAL_PATH, sesion=None, timeout=TIMEOUT_DESCARGA):
+    """Descarga el libro revalidando la última copia buena guardada en disco.
+
+    Envía If-None-Match / If-Modified-Since con los validadores de la última
+    descarga de la misma URL; un 304 reutiliza la copia local. Sin red se usa esa
+    copia y, si no existe, está dañada o es de otra URL, el archivo del
+    repositorio (``respaldo``).
+
+    Devuelve ``(contenido, origen)`` con origen ``'red'`` (descargado), ``'cache'``
+    (copia revalidada con un 304), ``'copia'`` (copia sin revalidar, por un error)
+    o ``'local'``.
+    """
+    ruta_libro = os.path.join(cache_dir, "control_obra.xlsx")
+    ruta_meta = os.path.join(cache_dir, "control_obra.json")
+    cabeceras = {}
+    meta = _leer_json(ruta_meta) if _es_xlsx(ruta_libro) else {}
+    # La copia y sus validadores solo sirven para la URL de la que se descargaron
+    hay_copia = meta.get("url") == url
+    if hay_copia:
+        if meta.get("etag"):
+            cabeceras["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            cabeceras["If-Modified-Since"] = meta["last_modified"]
+
+    try:
+        respuesta = (sesion or obtener_sesion()).get(url, headers=cabeceras, timeout=timeout)
+        if respuesta.status_code == 304 and hay_copia:
+            return _leer_bytes(ruta_libro), 'cache'
+        respuesta.raise_for_status()
+        contenido = respuesta.content
+        # Un .xlsx es un zip: no sobrescribir la copia buena con una página de error
+        if not contenido.startswith(b"PK"):
+            raise requests.RequestException("La respuesta no es un archivo .xlsx válido")
+        _escribir_atomico(ruta_libro, contenido)
+        _escribir_atomico(ruta_meta, json.dumps({
+            'url': url,
+            'etag': respuesta.headers.get("ETag"),
+            'last_modified': respuesta.headers.get("Last-Modified"),
+        }).encode("utf-8"))
+        return contenido, 'red'
+    except requests.RequestException:
+        if hay_copia:
+            return _leer_bytes(ruta_libro), 'copia'
+        if respaldo and os.path.exists(respaldo):
+            return _leer_bytes(respaldo), 'local'
+        raise
@@ -0,0 +1,83 @@
+"""Archivos servidos como estáticos por Streamlit (carpeta static/, server.enableStaticServing)."""
+import base64
+import hashlib
+import io
+import os
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+URL_STATIC = "app/static"
+# Derivados generados en tiempo de ejecución (no versionados)
+CARPETA_DERIVADOS = "cache"
+CALIDAD_WEBP = 90
+
+
+def huella_archivo(ruta, longitud=12):
+    with open(ruta, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:longitud]
+
+
+def version_estatico(nombre, static_dir=STATIC_DIR):
+    """Fecha de modificación (ns) del archivo: cambia al editarlo sin reiniciar la app"""
+    return os.stat(os.path.join(static_dir, nombre)).st_mtime_ns
+
+
+def url_estatico(nombre, static_dir=STATIC_DIR):
+    """URL relativa del archivo con su huella como parámetro: el navegador puede
+    guardarlo en caché y un cambio de contenido produce una URL nueva."""
+    return f"{URL_STATIC}/{nombre}?v={huella_archivo(os.path.join(static_dir, nombre))}"
+
+
+def leer_estatico(nombre, static_dir=STATIC_DIR):
+    with open(os.path.join(static_dir, nombre), encoding="utf-8") as f:
+        return f.read()
+
+
+def optimizar_imagen(contenido, alto):
+    """Reescala a ``alto`` px (sin ampliar) y recomprime en WebP; devuelve (bytes, extensión).
+
+    Sin Pillow instalado se devuelven los bytes originales.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return contenido, "png"
+    with Image.open(io.BytesIO(contenido)) as imagen:
+        imagen.load()
+        imagen.thumbnail((imagen.width * alto, alto), Image.LANCZOS)
+        if imagen.mode not in ("RGB", "RGBA"):
+            imagen = imagen.convert("RGBA")
+        salida = io.BytesIO()
+        imagen.save(salida, format="WEBP", quality=CALIDAD_WEBP, method=6)
+    return salida.getvalue(), "webp"
+
+
+def publicar_imagen(contenido, prefijo, alto, static_dir=STATIC_DIR):
+    """Publica una versión optimizada de la imagen en static/cache/, una vez por huella.
+
+    El nombre del archivo incluye la huella del original y el alto, así que la URL
+    resultante es inmutable y el navegador puede guardarla en caché. Devuelve
+    ``(nombre, bytes)``, con ``nombre`` relativo a ``static_dir``.
+    """
+    huella = hashlib.sha256(contenido).hexdigest()[:12]
+    carpeta = os.path.join(static_dir, CARPETA_DERIVADOS)
+    for extension in ("webp", "png"):
+        nombre = f"{CARPETA_DERIVADOS}/{prefijo}.{huella}.{alto}.{extension}"
+        ruta = os.path.join(static_dir, nombre)
+        if os.path.exists(ruta):
+            with open(ruta, "rb") as f:
+                return nombre, f.read()
+
+    optimizada, extension = optimizar_imagen(contenido, alto)
+    nombre = f"{CARPETA_DERIVADOS}/{prefijo}.{huella}.{alto}.{extension}"
+    os.makedirs(carpeta, exist_ok=True)
+    temporal = os.path.join(static_dir, nombre + ".tmp")
+    with open(temporal, "wb") as f:
+        f.write(optimizada)
+    os.replace(temporal, os.path.join(static_dir, nombre))
+    return nombre, optimizada
+
+
+def data_uri(contenido, nombre):
+    """Imagen en línea: respaldo sin servido estático y splash subidos por el usuario"""
+    tipo = "image/webp" if nombre.endswith(".webp") else "image/png"
+    return f"data:{tipo};base64,{base64.b64encode(contenido).decode()}"
@@ -0,0 +1,76 @@
+"""Almacén en disco de las fotos de novedades, direccionado por contenido
+(sin dependencias de Streamlit).
+
+Cada foto se reescala y recomprime una sola vez al capturarla y se guarda con
+su miniatura bajo la huella SHA-256 del original; la sesión solo conserva la huella.
+"""
+import hashlib
+import io
+import os
+
+from datos import DATOS_DIR
+
+RUTA_FOTOS = os.path.join(DATOS_DIR, "fotos")
+LADO_MAX_FOTO = 1600
+CALIDAD_FOTO = 80
+LADO_MINIATURA = 320
+CALIDAD_MINIATURA = 70
+
+
+def huella_foto(contenido):
+    return hashlib.sha256(contenido).hexdigest()
+
+
+def ruta_foto(huella, carpeta=RUTA_FOTOS):
+    # Subcarpeta por los dos primeros caracteres para no acumular miles de archivos juntos
+    return os.path.join(carpeta, huella[:2], f"{huella}.jpg")
+
+
+def ruta_miniatura(huella, carpeta=RUTA_FOTOS):
+    """Miniatura de la foto; sin Pillow no se genera y se usa la foto guardada"""
+    ruta = os.path.join(carpeta, huella[:2], f"{huella}.min.jpg")
+    return ruta if os.path.exists(ruta) else ruta_foto(huella, carpeta)
+
+
+def _escribir(ruta, contenido):
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        f.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def comprimir_foto(contenido, lado, calidad):
+    """Reescala al ``lado`` mayor indicado (sin ampliar) y recomprime en JPEG.
+
+    Aplica la orientación EXIF y descarta los metadatos. Sin Pillow instalado se
+    devuelven los bytes originales.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return contenido
+    with Image.open(io.BytesIO(contenido)) as imagen:
+        imagen = ImageOps.exif_transpose(imagen)
+        imagen.thumbnail((lado, lado), Image.LANCZOS)
+        if imagen.mode != "RGB":
+            imagen = imagen.convert("RGB")
+        salida = io.BytesIO()
+        imagen.save(salida, format="JPEG", quality=calidad, optimize=True)
+    return salida.getvalue()
+
+
+def guardar_foto(contenido, carpeta=RUTA_FOTOS):
+    """Guarda la foto comprimida y su miniatura si aún no existen; devuelve la huella"""
+    huella = huella_foto(contenido)
+    ruta = ruta_foto(huella, carpeta)
+    if os.path.exists(ruta):
+        return huella
+
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    foto = comprimir_foto(contenido, LADO_MAX_FOTO, CALIDAD_FOTO)
+    miniatura = comprimir_foto(foto, LADO_MINIATURA, CALIDAD_MINIATURA)
+    if miniatura is not foto:
+        _escribir(os.path.join(carpeta, huella[:2], f"{huella}.min.jpg"), miniatura)
+    # La foto se escribe al final: su existencia indica que la entrada está completa
+    _escribir(ruta, foto)
+    return huella
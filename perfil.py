@@ -0,0 +1,37 @@
+"""Tiempos de arranque por sección (sin dependencias de Streamlit).
+
+app.py registra aquí sus secciones de nivel superior; benchmarks/perfil_arranque.py
+los combina con ``python -X importtime`` en un informe por línea de comandos.
+"""
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# nombre de sección -> segundos de la última ejecución en este proceso
+TIEMPOS_SECCION = OrderedDict()
+
+
+def registrar_seccion(nombre, segundos):
+    TIEMPOS_SECCION[nombre] = segundos
+
+
+@contextmanager
+def medir_seccion(nombre):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar_seccion(nombre, time.perf_counter() - inicio)
+
+
+def leer_importtime(texto):
+    """Convierte la salida de ``-X importtime`` en [(modulo, propio_us, acumulado_us, nivel)]"""
+    filas = []
+    for linea in texto.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|", 2)
+        modulo = nombre.rstrip()
+        nivel = (len(modulo) - len(modulo.lstrip())) // 2
+        filas.append((modulo.strip(), int(propio), int(acumulado), nivel))
+    return filas
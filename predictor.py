@@ -0,0 +1,376 @@
+"""Predicción de cumplimiento de contratos con el MLP (sin dependencias de Streamlit).
+
+joblib y sklearn no se importan aquí: ``cargar_artefactos`` los trae bajo demanda.
+"""
+import importlib.util
+import json
+import math
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------
+# ARTEFACTOS DEL MODELO
+# -----------------------------
+ASSETS_DIR = "assets"
+MANIFIESTO_PATH = os.path.join(ASSETS_DIR, "mlp_manifest.json")
+ARCHIVOS_POR_DEFECTO = {
+    'modelo': "mlp_contratos.joblib",
+    'scaler': "scaler_contratos.joblib",
+    'features': "mlp_features.joblib",
+}
+DEPENDENCIAS_ML = ("joblib", "sklearn")
+
+# avisos: diferencias no fatales con el manifiesto (p. ej. versión de sklearn distinta)
+ArtefactosMLP = namedtuple("ArtefactosMLP", ["modelo", "scaler", "features", "predecir", "tabla", "avisos"])
+
+
+def leer_manifiesto(manifiesto=MANIFIESTO_PATH):
+    """Contenido del manifiesto, o {} si no existe (se usan los nombres por defecto)"""
+    if not os.path.exists(manifiesto):
+        return {}
+    with open(manifiesto, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def rutas_artefactos(manifiesto=MANIFIESTO_PATH):
+    """Rutas de los artefactos si el MLP puede cargarse; si no, None.
+
+    Comprobación barata: lee el manifiesto (o usa los nombres por defecto), mira
+    que los archivos existan y que joblib/sklearn estén instalados, sin importarlos.
+    """
+    archivos = dict(ARCHIVOS_POR_DEFECTO)
+    try:
+        archivos.update(leer_manifiesto(manifiesto).get("archivos", {}))
+    except (OSError, ValueError):
+        return None
+    carpeta = os.path.dirname(manifiesto)
+    rutas = {clave: os.path.join(carpeta, nombre) for clave, nombre in archivos.items()}
+    if not all(os.path.exists(ruta) for ruta in rutas.values()):
+        return None
+    if any(importlib.util.find_spec(modulo) is None for modulo in DEPENDENCIAS_ML):
+        return None
+    return rutas
+
+
+def validar_artefactos(modelo, features, manifiesto):
+    """Contrasta los artefactos cargados con el manifiesto.
+
+    Lanza ValueError si el número de variables no coincide (el modelo daría
+    resultados sin sentido) y devuelve la lista de avisos no fatales.
+    """
+    import sklearn
+
+    n_modelo = getattr(modelo, 'n_features_in_', None)
+    if n_modelo is not None and n_modelo != len(features):
+        raise ValueError(f"El modelo espera {n_modelo} variables y la lista de features tiene {len(features)}")
+    esperadas = manifiesto.get("n_features")
+    if esperadas is not None and esperadas != len(features):
+        raise ValueError(f"El manifiesto declara {esperadas} variables y la lista de features tiene {len(features)}")
+
+    avisos = []
+    version = manifiesto.get("sklearn_version")
+    if version and version != sklearn.__version__:
+        avisos.append(f"El MLP se entrenó con scikit-learn {version} y está instalado {sklearn.__version__}; "
+                      "las predicciones podrían no ser fiables.")
+    return avisos
+
+
+def cargar_artefactos(rutas, con_tabla_prediccion=True, manifiesto=MANIFIESTO_PATH):
+    """Importa joblib (y con él sklearn), carga modelo, scaler y features, los valida
+    contra el manifiesto y construye los predictores"""
+    import joblib
+
+    modelo = joblib.load(rutas['modelo'])
+    scaler = joblib.load(rutas['scaler'])
+    features = joblib.load(rutas['features'])
+    avisos = validar_artefactos(modelo, features, leer_manifiesto(manifiesto))
+    tabla = construir_tabla_prediccion(modelo, scaler, features) if con_tabla_prediccion else None
+    predecir = con_tabla(construir_predictor(modelo, scaler, features), tabla)
+    return ArtefactosMLP(modelo, scaler, features, predecir, tabla, avisos)
+
+
+# -----------------------------
+# ENTRADAS DEL MODELO
+# -----------------------------
+COLUMNAS_NUMERICAS = ['dias_legalizacion_esperados', 'numero_reprogramaciones']
+COLUMNAS_CATEGORICAS = ['prioridad', 'tipo_contrato', 'CNCCompromiso']
+COLUMNAS_ENTRADA = COLUMNAS_NUMERICAS + COLUMNAS_CATEGORICAS
+
+OPCIONES_PRIORIDAD = ['Alta', 'Media', 'Baja']
+OPCIONES_TIPO_CONTRATO = ['Obra', 'Suministro', 'Servicios', 'Subcontrato']
+OPCIONES_CNC = ['Aprobación interna', 'Proveedor', 'Legalización interna', 'Financiera']
+
+# Rangos realistas de la tabla precalculada (ambos extremos incluidos)
+RANGO_DIAS_TABLA = (1, 60)
+RANGO_REPROG_TABLA = (0, 10)
+
+# Restricciones de la hoja que se puntúan y cómo se llevan a las entradas del modelo
+TIPOS_RESTRICCION_CONTRATO = ['Contratos', 'Contratos no Categorizables']
+COLUMNA_RIESGO = 'ProbCumplimiento'
+# Solo se puntúan filas con las cinco entradas reales; nunca se rellenan con valores supuestos
+MAPEO_COLUMNAS_RESTRICCION = {
+    'dias_legalizacion_esperados': 'dias_legalizacion_esperados',
+    'numero_reprogramaciones': 'numeroReprogramacionesCompromiso',
+    'prioridad': 'prioridad',
+    'tipo_contrato': 'tipo_contrato',
+    'CNCCompromiso': 'CNCCompromiso',
+}
+OPCIONES_CATEGORICAS = {
+    'prioridad': OPCIONES_PRIORIDAD,
+    'tipo_contrato': OPCIONES_TIPO_CONTRATO,
+    'CNCCompromiso': OPCIONES_CNC,
+}
+
+# probabilidades: array (prioridad, tipo_contrato, CNC, días, reprogramaciones)
+TablaPrediccion = namedtuple("TablaPrediccion", ["probabilidades", "clases", "dias", "reprogramaciones", "indices"])
+
+
+# -----------------------------
+# PREDICCIÓN DE UNA FILA
+# -----------------------------
+def _relu(h):
+    np.maximum(h, 0.0, out=h)
+
+
+def _tanh(h):
+    np.tanh(h, out=h)
+
+
+def _logistic(h):
+    np.negative(h, out=h)
+    np.exp(h, out=h)
+    h += 1.0
+    np.reciprocal(h, out=h)
+
+
+def _identity(h):
+    pass
+
+
+ACTIVACIONES_EN_SITIO = {'relu': _relu, 'tanh': _tanh, 'logistic': _logistic, 'identity': _identity}
+
+
+def construir_predictor(modelo, scaler, features):
+    """Compila, a partir de FEATURES_NN, un predictor de una fila sin pandas.
+
+    Las cinco entradas se escriben directamente en un vector de features
+    preasignado (uno por hilo) y una sola pasada hacia delante con los pesos del
+    MLP devuelve ``(prediccion, prob_cumplimiento)``, igual que
+    ``predict``/``predict_proba``. Si el modelo no es un clasificador binario
+    con salida logística, o el escalador no es un StandardScaler, se usa
+    ``puntuar_lote`` como respaldo.
+    """
+    features = list(features)
+    activacion = ACTIVACIONES_EN_SITIO.get(getattr(modelo, 'activation', None))
+    if (activacion is None or getattr(modelo, 'out_activation_', None) != 'logistic'
+            or len(modelo.classes_) != 2 or not hasattr(scaler, 'with_mean')):
+        def predecir_respaldo(dias, reprogramaciones, prioridad, tipo_contrato, cnc):
+            fila = pd.DataFrame({
+                'dias_legalizacion_esperados': [dias], 'numero_reprogramaciones': [reprogramaciones],
+                'prioridad': [prioridad], 'tipo_contrato': [tipo_contrato], 'CNCCompromiso': [cnc],
+            })
+            resultado = puntuar_lote(fila, modelo, scaler, features)
+            return resultado['prediccion'].iat[0], float(resultado['prob_cumplimiento'].iat[0])
+        return predecir_respaldo
+
+    posicion = {feature: i for i, feature in enumerate(features)}
+    columnas_scaler = list(getattr(scaler, 'feature_names_in_', COLUMNAS_NUMERICAS))
+    # Como StandardScaler.transform: con with_mean=False mean_ se calcula pero no se
+    # resta, y con with_std=False scale_ queda en None
+    media = scaler.mean_ if scaler.with_mean and scaler.mean_ is not None else np.zeros(len(columnas_scaler))
+    escala = scaler.scale_ if scaler.with_std and scaler.scale_ is not None else np.ones(len(columnas_scaler))
+    i_dias, i_reprog = (posicion[col] for col in COLUMNAS_NUMERICAS)
+    j_dias, j_reprog = (columnas_scaler.index(col) for col in COLUMNAS_NUMERICAS)
+    media_dias, escala_dias = float(media[j_dias]), float(escala[j_dias])
+    media_reprog, escala_reprog = float(media[j_reprog]), float(escala[j_reprog])
+
+    indices_categoria = {}
+    for col in COLUMNAS_CATEGORICAS:
+        prefijo = f"{col}_"
+        indices_categoria[col] = {
+            feature[len(prefijo):]: i for feature, i in posicion.items() if feature.startswith(prefijo)
+        }
+    i_prioridad = indices_categoria['prioridad']
+    i_contrato = indices_categoria['tipo_contrato']
+    i_cnc = indices_categoria['CNCCompromiso']
+
+    pesos = [np.ascontiguousarray(w, dtype=float) for w in modelo.coefs_]
+    sesgos = [np.asarray(b, dtype=float) for b in modelo.intercepts_]
+    ocultas = list(zip(pesos[:-1], sesgos[:-1]))
+    peso_salida, sesgo_salida = pesos[-1][:, 0], float(sesgos[-1][0])
+    clase_negativa, clase_positiva = modelo.classes_
+    local = threading.local()
+
+    def predecir(dias, reprogramaciones, prioridad, tipo_contrato, cnc):
+        x = getattr(local, 'x', None)
+        if x is None:
+            x = local.x = np.zeros(len(features))
+            local.capas = [np.empty(w.shape[1]) for w, _ in ocultas]
+        else:
+            x.fill(0.0)
+        x[i_dias] = (dias - media_dias) / escala_dias
+        x[i_reprog] = (reprogramaciones - media_reprog) / escala_reprog
+        for indices, valor in ((i_prioridad, prioridad), (i_contrato, tipo_contrato), (i_cnc, cnc)):
+            i = indices.get(valor)
+            if i is not None:
+                x[i] = 1.0
+
+        a = x
+        for (w, b), h in zip(ocultas, local.capas):
+            np.dot(a, w, out=h)
+            h += b
+            activacion(h)
+            a = h
+        z = float(np.dot(a, peso_salida)) + sesgo_salida
+        prob = 0.5 * (1.0 + math.tanh(0.5 * z))
+        return (clase_positiva if prob > 0.5 else clase_negativa), prob
+
+    return predecir
+
+
+# -----------------------------
+# TABLA PRECALCULADA DEL ESPACIO DE ENTRADAS
+# -----------------------------
+def construir_tabla_prediccion(modelo, scaler, features, rango_dias=RANGO_DIAS_TABLA,
+                               rango_reprog=RANGO_REPROG_TABLA):
+    """Probabilidad de cumplimiento para toda la rejilla discreta de entradas.
+
+    Se genera con una única llamada a ``predict_proba`` (vía ``puntuar_lote``).
+    """
+    dias = np.arange(rango_dias[0], rango_dias[1] + 1)
+    reprogramaciones = np.arange(rango_reprog[0], rango_reprog[1] + 1)
+    ejes = [OPCIONES_PRIORIDAD, OPCIONES_TIPO_CONTRATO, OPCIONES_CNC, dias, reprogramaciones]
+    forma = tuple(len(eje) for eje in ejes)
+    rejilla = np.indices(forma).reshape(len(forma), -1)
+    lote = pd.DataFrame({
+        'dias_legalizacion_esperados': dias[rejilla[3]],
+        'numero_reprogramaciones': reprogramaciones[rejilla[4]],
+        'prioridad': np.asarray(OPCIONES_PRIORIDAD)[rejilla[0]],
+        'tipo_contrato': np.asarray(OPCIONES_TIPO_CONTRATO)[rejilla[1]],
+        'CNCCompromiso': np.asarray(OPCIONES_CNC)[rejilla[2]],
+    })
+    probabilidades = puntuar_lote(lote, modelo, scaler, features)['prob_cumplimiento'].to_numpy()
+    indices = tuple({valor: i for i, valor in enumerate(opciones)}
+                    for opciones in (OPCIONES_PRIORIDAD, OPCIONES_TIPO_CONTRATO, OPCIONES_CNC))
+    return TablaPrediccion(probabilidades.reshape(forma), modelo.classes_, dias, reprogramaciones, indices)
+
+
+def consultar_tabla(tabla, dias, reprogramaciones, prioridad, tipo_contrato, cnc):
+    """``(prediccion, prob_cumplimiento)`` desde la tabla, o None si la entrada queda fuera"""
+    i_prioridad, i_contrato, i_cnc = tabla.indices
+    try:
+        posicion = (i_prioridad[prioridad], i_contrato[tipo_contrato], i_cnc[cnc],
+                    int(dias) - int(tabla.dias[0]), int(reprogramaciones) - int(tabla.reprogramaciones[0]))
+    except (KeyError, TypeError, ValueError):
+        return None
+    if (dias != int(dias) or reprogramaciones != int(reprogramaciones)
+            or not 0 <= posicion[3] < len(tabla.dias) or not 0 <= posicion[4] < len(tabla.reprogramaciones)):
+        return None
+    prob = float(tabla.probabilidades[posicion])
+    return tabla.clases[1 if prob > 0.5 else 0], prob
+
+
+def con_tabla(predecir, tabla):
+    """Envuelve un predictor para que consulte primero la tabla precalculada"""
+    if tabla is None:
+        return predecir
+
+    def predecir_con_tabla(dias, reprogramaciones, prioridad, tipo_contrato, cnc):
+        resultado = consultar_tabla(tabla, dias, reprogramaciones, prioridad, tipo_contrato, cnc)
+        if resultado is None:
+            return predecir(dias, reprogramaciones, prioridad, tipo_contrato, cnc)
+        return resultado
+
+    return predecir_con_tabla
+
+
+# -----------------------------
+# PUNTUACIÓN POR LOTE
+# -----------------------------
+def codificar_lote(df, scaler, features):
+    """Codifica y escala un lote de contratos en una sola pasada vectorizada.
+
+    Equivale a ``pd.get_dummies`` + completar/reordenar según ``features`` +
+    ``scaler.transform`` fila a fila; las categorías desconocidas quedan en cero.
+    """
+    faltantes = [col for col in COLUMNAS_ENTRADA if col not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+
+    posicion = {feature: i for i, feature in enumerate(features)}
+    X = np.zeros((len(df), len(features)), dtype=float)
+
+    numericas = df[COLUMNAS_NUMERICAS].apply(pd.to_numeric, errors="coerce")
+    if numericas.isna().any().any():
+        filas = (numericas.isna().any(axis=1).to_numpy().nonzero()[0] + 1).tolist()
+        raise ValueError(f"Valores numéricos vacíos o inválidos en las filas: {filas[:10]}")
+    escaladas = scaler.transform(numericas.astype(float))
+    for j, col in enumerate(COLUMNAS_NUMERICAS):
+        X[:, posicion[col]] = escaladas[:, j]
+
+    for col in COLUMNAS_CATEGORICAS:
+        valores = df[col].astype(str).str.strip().to_numpy()
+        prefijo = f"{col}_"
+        for feature, i in posicion.items():
+            if feature.startswith(prefijo):
+                X[:, i] = valores == feature[len(prefijo):]
+
+    return pd.DataFrame(X, columns=list(features), index=df.index)
+
+
+def puntuar_lote(df, modelo, scaler, features):
+    """Devuelve una copia de ``df`` con ``prob_cumplimiento`` y ``prediccion``.
+
+    Se hace una única llamada a ``predict_proba`` para todo el lote; la clase
+    predicha se deriva de esas mismas probabilidades.
+    """
+    X = codificar_lote(df, scaler, features)
+    probabilidades = modelo.predict_proba(X)
+    resultado = df.copy()
+    resultado['prob_cumplimiento'] = probabilidades[:, 1]
+    resultado['prediccion'] = modelo.classes_.take(probabilidades.argmax(axis=1))
+    return resultado
+
+
+def columnas_riesgo_faltantes(df):
+    """Columnas de la hoja Restricciones que faltan para puntuar con entradas reales"""
+    return [col for col in ['tipoRestriccion', *MAPEO_COLUMNAS_RESTRICCION.values()] if col not in df.columns]
+
+
+def puntuar_restricciones(df, modelo, scaler, features):
+    """Probabilidad de cumplimiento de cada restricción de contrato de la hoja Restricciones.
+
+    Solo se puntúan las filas de contrato con las cinco entradas del modelo
+    registradas en la hoja (numéricas válidas y categorías conocidas); el resto
+    no recibe valor. Devuelve una Serie alineada con el índice de ``df``,
+    calculada con una única llamada vectorizada al modelo.
+    """
+    if columnas_riesgo_faltantes(df):
+        return pd.Series(dtype=float, name=COLUMNA_RIESGO)
+
+    contratos = df[df['tipoRestriccion'].isin(TIPOS_RESTRICCION_CONTRATO)]
+    lote = pd.DataFrame({entrada: contratos[columna] for entrada, columna in MAPEO_COLUMNAS_RESTRICCION.items()})
+    completas = pd.Series(True, index=lote.index)
+    for col in COLUMNAS_NUMERICAS:
+        lote[col] = pd.to_numeric(lote[col], errors="coerce")
+        completas &= lote[col].notna()
+    for col, opciones in OPCIONES_CATEGORICAS.items():
+        lote[col] = lote[col].astype(str).str.strip()
+        completas &= lote[col].isin(opciones)
+    lote = lote[completas]
+    if lote.empty:
+        return pd.Series(dtype=float, name=COLUMNA_RIESGO)
+
+    probabilidades = puntuar_lote(lote, modelo, scaler, features)['prob_cumplimiento']
+    return probabilidades.rename(COLUMNA_RIESGO)
+
+
+def leer_lote(nombre, contenido):
+    """Lee un CSV o XLSX subido con las columnas de COLUMNAS_ENTRADA"""
+    if nombre.lower().endswith(".csv"):
+        return pd.read_csv(contenido)
+    return pd.read_excel(contenido)
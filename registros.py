@@ -0,0 +1,177 @@
+"""Guardado de registros de restricción y novedades fuera del ciclo de cada rerun
+(sin dependencias de Streamlit)."""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from datos import DATOS_DIR
+
+RUTA_BD = os.path.join(DATOS_DIR, "registros.sqlite3")
+
+# Columnas propias para filtrar; el formulario completo queda en 'datos' (JSON)
+ESQUEMA_REGISTROS = """
+CREATE TABLE IF NOT EXISTS registros (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tipo TEXT NOT NULL,
+    fecha TEXT NOT NULL,
+    proyecto TEXT,
+    urgencia TEXT,
+    datos TEXT NOT NULL,
+    sincronizado INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_registros_proyecto ON registros (proyecto, fecha);
+CREATE INDEX IF NOT EXISTS idx_registros_urgencia ON registros (urgencia, fecha);
+CREATE INDEX IF NOT EXISTS idx_registros_fecha ON registros (fecha);
+"""
+# Bandeja de salida hacia Google Sheets: solo indexa lo que falta por enviar
+INDICE_PENDIENTES = "CREATE INDEX IF NOT EXISTS idx_registros_pendientes ON registros (id) WHERE sincronizado = 0"
+
+
+def nuevo_registro(tipo, datos):
+    """Registro listo para encolar: ``tipo`` ('registro' o 'novedad'), fecha y campos del formulario"""
+    return {'tipo': tipo, 'fecha': datetime.now().isoformat(timespec="seconds"), **datos}
+
+
+class AlmacenRegistros:
+    """Almacén local de registros y novedades en SQLite (modo WAL).
+
+    Una conexión por hilo: el hilo de la cola escribe por lotes mientras las
+    sesiones leen sin bloquearse. No requiere servicios externos.
+    """
+
+    def __init__(self, ruta=RUTA_BD):
+        self.ruta = ruta
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        with self._conexion() as conexion:
+            conexion.executescript(ESQUEMA_REGISTROS)
+            conexion.execute(INDICE_PENDIENTES)
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=30)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def insertar_lote(self, lote):
+        """Inserta el lote completo en una sola transacción"""
+        filas = [
+            (registro['tipo'], registro['fecha'], registro.get('proyecto'), registro.get('urgencia'),
+             json.dumps(registro, ensure_ascii=False))
+            for registro in lote
+        ]
+        with self._conexion() as conexion:
+            conexion.executemany(
+                "INSERT INTO registros (tipo, fecha, proyecto, urgencia, datos) VALUES (?, ?, ?, ?, ?)", filas
+            )
+
+    def listar(self, tipo=None, proyecto=None, urgencia=None, desde=None, hasta=None, limite=500):
+        """Registros más recientes primero, filtrados por los índices de proyecto, urgencia y fecha"""
+        condiciones, parametros = [], []
+        for columna, valor in (('tipo', tipo), ('proyecto', proyecto), ('urgencia', urgencia)):
+            if valor:
+                condiciones.append(f"{columna} = ?")
+                parametros.append(valor)
+        if desde:
+            condiciones.append("fecha >= ?")
+            parametros.append(desde)
+        if hasta:
+            condiciones.append("fecha < ?")
+            parametros.append(hasta)
+        donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        filas = self._conexion().execute(
+            f"SELECT id, datos FROM registros {donde} ORDER BY fecha DESC, id DESC LIMIT ?",
+            (*parametros, limite)
+        ).fetchall()
+        return pd.DataFrame([{'id': id_, **json.loads(datos)} for id_, datos in filas])
+
+    def pendientes_sincronizar(self, limite=500):
+        """Registros aún no enviados, en orden de guardado: ``[(id, registro), ...]``"""
+        filas = self._conexion().execute(
+            "SELECT id, datos FROM registros WHERE sincronizado = 0 ORDER BY id LIMIT ?", (limite,)
+        ).fetchall()
+        return [(id_, json.loads(datos)) for id_, datos in filas]
+
+    def marcar_sincronizados(self, ids):
+        with self._conexion() as conexion:
+            conexion.executemany("UPDATE registros SET sincronizado = 1 WHERE id = ?", [(id_,) for id_ in ids])
+
+    def contar_pendientes(self):
+        return self._conexion().execute("SELECT COUNT(*) FROM registros WHERE sincronizado = 0").fetchone()[0]
+
+
+class ColaEscritura:
+    """Cola de escritura diferida, común a todas las sesiones.
+
+    ``encolar`` vuelve de inmediato; un hilo en segundo plano agrupa lo pendiente
+    (hasta ``max_lote`` registros o ``espera`` segundos) y lo entrega a
+    ``destino(lote)``. Si el destino falla, el lote se reintenta.
+    """
+
+    def __init__(self, destino, max_lote=200, espera=0.2, pausa_reintento=1.0):
+        self._destino = destino
+        self.max_lote = max_lote
+        self.espera = espera
+        self.pausa_reintento = pausa_reintento
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self.escritos = 0
+        self.lotes = 0
+        self.ultimo_error = None
+        self._hilo = threading.Thread(target=self._trabajar, name="cola_escritura", daemon=True)
+        self._hilo.start()
+
+    def encolar(self, registro):
+        self._cola.put(registro)
+
+    def _siguiente_lote(self):
+        lote = [self._cola.get()]
+        limite = time.monotonic() + self.espera
+        while len(lote) < self.max_lote:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _trabajar(self):
+        while True:
+            lote = self._siguiente_lote()
+            while True:
+                try:
+                    self._destino(lote)
+                    break
+                except Exception as e:
+                    with self._lock:
+                        self.ultimo_error = repr(e)
+                    time.sleep(self.pausa_reintento)
+            with self._lock:
+                self.escritos += len(lote)
+                self.lotes += 1
+            for _ in lote:
+                self._cola.task_done()
+
+    def vaciar(self):
+        """Bloquea hasta que todo lo encolado se haya escrito (para cierres ordenados y benchmarks)"""
+        self._cola.join()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'pendientes': self._cola.qsize(),
+                'escritos': self.escritos,
+                'lotes': self.lotes,
+                'ultimo_error': self.ultimo_error,
+            }
@@ -0,0 +1,185 @@
+"""Envío en segundo plano de registros y novedades a una hoja de Google Sheets
+(sin dependencias de Streamlit).
+
+La bandeja de salida es la propia base local: cada fila queda marcada como
+pendiente hasta que la hoja confirma el envío, así que nada se pierde si la
+app se reinicia a mitad de camino.
+"""
+import importlib.util
+import os
+import random
+import threading
+
+GSPREAD_AVAILABLE = importlib.util.find_spec("gspread") is not None
+
+# Configuración por variables de entorno, igual que MAR_CACHE_DIR
+ENV_CREDENCIALES = "MAR_SHEETS_CREDENCIALES"  # ruta al JSON de la cuenta de servicio
+ENV_LIBRO = "MAR_SHEETS_LIBRO"                # clave del libro (la parte de la URL tras /d/)
+ENV_HOJA = "MAR_SHEETS_HOJA"
+HOJA_POR_DEFECTO = "Registros"
+
+# Una columna por campo de los formularios de registro y de novedad
+COLUMNAS_HOJA = [
+    'id', 'tipo', 'fecha', 'proyecto', 'componente', 'acuerdo_servicio', 'detalle_opcional', 'resumen',
+    'tipo_observacion', 'urgencia', 'descripcion', 'foto_adjunta', 'foto',
+]
+
+
+def configuracion_hoja():
+    """Parámetros de ``abrir_hoja`` desde el entorno, o None si la sincronización no está configurada"""
+    credenciales = os.environ.get(ENV_CREDENCIALES)
+    libro = os.environ.get(ENV_LIBRO)
+    if not (GSPREAD_AVAILABLE and credenciales and libro):
+        return None
+    return {
+        'credenciales': credenciales,
+        'libro': libro,
+        'nombre_hoja': os.environ.get(ENV_HOJA, HOJA_POR_DEFECTO),
+    }
+
+
+def abrir_hoja(credenciales, libro, nombre_hoja=HOJA_POR_DEFECTO):
+    """Abre (o crea con su encabezado) la hoja destino del libro"""
+    import gspread
+
+    cliente = gspread.service_account(filename=credenciales)
+    documento = cliente.open_by_key(libro)
+    try:
+        hoja = documento.worksheet(nombre_hoja)
+    except gspread.WorksheetNotFound:
+        hoja = documento.add_worksheet(title=nombre_hoja, rows=1000, cols=len(COLUMNAS_HOJA))
+    if not hoja.row_values(1):
+        hoja.append_rows([COLUMNAS_HOJA], value_input_option="RAW")
+    return hoja
+
+
+def fila_hoja(id_, registro):
+    """Convierte un registro guardado en una fila con el orden de ``COLUMNAS_HOJA``"""
+    valores = {**registro, 'id': id_}
+    return [str(valores.get(columna, '') or '') for columna in COLUMNAS_HOJA]
+
+
+def es_error_cuota(error):
+    """True si la API rechazó la llamada por cuota (HTTP 429 / RESOURCE_EXHAUSTED)"""
+    respuesta = getattr(error, 'response', None)
+    codigo = getattr(error, 'code', None) or getattr(respuesta, 'status_code', None)
+    if codigo == 429:
+        return True
+    # Sin código HTTP solo se aceptan los estados de cuota de la API de Google, no cifras sueltas
+    texto = str(error)
+    return any(marca in texto for marca in ("RESOURCE_EXHAUSTED", "RATE_LIMIT_EXCEEDED"))
+
+
+class SincronizadorHoja:
+    """Vacía la bandeja de salida del almacén hacia la hoja en lotes.
+
+    Cada lote es una sola llamada a ``append_rows`` (hasta ``max_lote`` filas)
+    en lugar de una llamada por fila. Ante errores de cuota espera de forma
+    exponencial (``espera_base`` · 2^n, con jitter, hasta ``espera_max``); ante
+    otros errores espera ``espera_max`` antes de reintentar. Tras un error o un
+    reinicio, los pendientes cuyo 'id' ya figura en la hoja se marcan sin
+    reenviarse, así que un lote escrito a medias no se duplica. ``abrir`` es una
+    función sin argumentos que devuelve la hoja (o un doble local en pruebas) y
+    se llama desde el hilo, así que el arranque de la app no espera a la red.
+    """
+
+    def __init__(self, almacen, abrir, max_lote=500, intervalo=30.0, espera_base=1.0, espera_max=64.0):
+        self.almacen = almacen
+        self._abrir = abrir
+        self._hoja = None
+        # Al arrancar no se sabe si el último lote del proceso anterior llegó a marcarse
+        self._conciliar = True
+        self.max_lote = max_lote
+        self.intervalo = intervalo
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._lock = threading.Lock()
+        self._fallos_cuota = 0
+        self.enviados = 0
+        self.llamadas = 0
+        self.errores_cuota = 0
+        self.ultimo_error = None
+        self._hilo = threading.Thread(target=self._trabajar, name="sincronizador_hoja", daemon=True)
+        self._hilo.start()
+
+    def despertar(self):
+        """Pide un envío inmediato (p. ej. justo después de guardar un lote)"""
+        self._despertar.set()
+
+    def detener(self, espera=None):
+        self._detener.set()
+        self._despertar.set()
+        self._hilo.join(espera)
+
+    def sincronizar_pendientes(self):
+        """Envía un lote pendiente y lo marca como sincronizado; devuelve cuántas filas dejó al día"""
+        pendientes = self.almacen.pendientes_sincronizar(self.max_lote)
+        if not pendientes:
+            return 0
+        if self._hoja is None:
+            self._hoja = self._abrir()
+        por_enviar = self._conciliar_con_hoja(pendientes) if self._conciliar else pendientes
+        if por_enviar:
+            with self._lock:
+                self.llamadas += 1
+            self._hoja.append_rows([fila_hoja(id_, registro) for id_, registro in por_enviar],
+                                   value_input_option="RAW")
+            self.almacen.marcar_sincronizados([id_ for id_, _ in por_enviar])
+            with self._lock:
+                self.enviados += len(por_enviar)
+        return len(pendientes)
+
+    def _conciliar_con_hoja(self, pendientes):
+        """Marca los pendientes que ya están en la hoja y devuelve el resto.
+
+        Tras un fallo no se sabe qué parte del lote escribió ``append_rows``, ni
+        tras un reinicio si el último lote enviado llegó a marcarse; la columna
+        'id' de la hoja lo dice con una sola lectura.
+        """
+        with self._lock:
+            self.llamadas += 1
+        en_hoja = set(self._hoja.col_values(1)[1:])
+        ya_enviados = [id_ for id_, _ in pendientes if str(id_) in en_hoja]
+        if ya_enviados:
+            self.almacen.marcar_sincronizados(ya_enviados)
+        self._conciliar = False
+        return [(id_, registro) for id_, registro in pendientes if str(id_) not in en_hoja]
+
+    def _pausa_tras_error(self, error):
+        with self._lock:
+            self.ultimo_error = repr(error)
+            if not es_error_cuota(error):
+                self._fallos_cuota = 0
+                return self.espera_max
+            self.errores_cuota += 1
+            self._fallos_cuota += 1
+            pausa = min(self.espera_max, self.espera_base * 2 ** (self._fallos_cuota - 1))
+        return pausa * random.uniform(0.5, 1.0)
+
+    def _trabajar(self):
+        while not self._detener.is_set():
+            self._despertar.clear()
+            try:
+                enviados = self.sincronizar_pendientes()
+            except Exception as e:
+                self._conciliar = True
+                self._detener.wait(self._pausa_tras_error(e))
+                continue
+            with self._lock:
+                self._fallos_cuota = 0
+            if enviados < self.max_lote:
+                # Bandeja vacía: se espera al siguiente guardado o al intervalo
+                self._despertar.wait(self.intervalo)
+
+    def estadisticas(self):
+        pendientes = self.almacen.contar_pendientes()
+        with self._lock:
+            return {
+                'pendientes': pendientes,
+                'enviados': self.enviados,
+                'llamadas': self.llamadas,
+                'errores_cuota': self.errores_cuota,
+                'ultimo_error': self.ultimo_error,
+            }
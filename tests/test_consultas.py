@@ -0,0 +1,174 @@
+"""Enrutado de preguntas (el intérprete debe decidir lo mismo que la cascada de
+comprobaciones ``in pregunta_norm`` a la que sustituye) y caché de respuestas."""
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from consultas import CARGOS_VALIDOS_NORM, MAPEO_RESTRICCION, CacheLRU, construir_parser, tamano_aproximado
+from datos import normalizar_texto, quitar_tildes
+
+PROYECTOS = {
+    "burdeos": "Burdeos",
+    "lorca": "Lorca",
+    "penon de alicante": "Peñon de Alicante",
+    "alicante": "Alicante",
+    "el castell iberia reservado": "El Castell Iberia Reservado",
+}
+
+PREGUNTAS = [
+    "avance de obra en lorca",
+    "avance de obras en burdeos",
+    "avance obra burdeos",
+    "avance en diseño de lorca",
+    "estado diseno burdeos",
+    "inventario diseño lorca",
+    "responsables de burdeos",
+    "residentes de burdeos",
+    "quien es el residente auxiliar #2 en lorca",
+    "director de obra y arquitecto en burdeos",
+    "cargos en el peñón de alicante",
+    "problematicas en burdeos",
+    "problemas en alicante",
+    "restricciones de materiales en peñon de alicante",
+    "restriccion de diseño en lorca",
+    "restricciones de permisos y de contratos",
+    "restricciones financieras burdeos",
+    "sostenibilidad lorca",
+    "certificación edge",
+    "impacto ambiental en burdeos",
+    "avance de obra y restricciones en lorca",
+    "responsable de las restricciones",
+    "cual es el clima hoy en la obra",
+    "lorcas",
+    "",
+]
+
+
+def normalizar(pregunta):
+    return quitar_tildes(normalizar_texto(pregunta))
+
+
+def extraer_proyecto_anterior(texto_norm):
+    for norm in sorted(PROYECTOS, key=len, reverse=True):
+        if re.search(rf'(^|\W){re.escape(norm)}($|\W)', texto_norm, flags=re.UNICODE):
+            return PROYECTOS[norm], norm
+    for norm in sorted(PROYECTOS, key=len, reverse=True):
+        if norm in texto_norm:
+            return PROYECTOS[norm], norm
+    return None, None
+
+
+def cascada_anterior(pregunta_norm):
+    """(intención, proyecto_norm, cargo, primer tipo de restricción) según el enrutado anterior"""
+    _, proyecto_norm = extraer_proyecto_anterior(pregunta_norm)
+    if "avance de obra" in pregunta_norm or "avance obra" in pregunta_norm:
+        return 'avance_obra', proyecto_norm, None, None
+    if any(f in pregunta_norm for f in ["avance en diseno", "avance diseno", "estado diseno", "inventario diseno"]):
+        intencion = 'inventario_diseno' if "inventario" in pregunta_norm else 'avance_diseno'
+        return intencion, proyecto_norm, None, None
+    if "responsable" in pregunta_norm or "cargo" in pregunta_norm or any(c in pregunta_norm for c in CARGOS_VALIDOS_NORM):
+        cargo = next((real for norm, real in CARGOS_VALIDOS_NORM.items() if norm in pregunta_norm), None)
+        return 'responsables', proyecto_norm, cargo, None
+    if "restriccion" in pregunta_norm or "problema" in pregunta_norm:
+        tipo = next((real for keyword, real in MAPEO_RESTRICCION.items()
+                     if f"restriccion de {keyword}" in pregunta_norm or f"restricciones de {keyword}" in pregunta_norm), None)
+        return 'restricciones', proyecto_norm, None, tipo
+    if any(k in pregunta_norm for k in ["sostenibilidad", "edge", "sostenible", "ambiental"]):
+        return 'sostenibilidad', proyecto_norm, None, None
+    return None, proyecto_norm, None, None
+
+
+@pytest.fixture(scope="module")
+def interpretar():
+    return construir_parser(PROYECTOS)
+
+
+@pytest.mark.parametrize("pregunta", PREGUNTAS)
+def test_enruta_como_la_cascada_anterior(interpretar, pregunta):
+    pregunta_norm = normalizar(pregunta)
+    consulta = interpretar(pregunta_norm)
+    primer_tipo = consulta.tipos_restriccion[0] if consulta.tipos_restriccion else None
+
+    assert (consulta.intencion, consulta.proyecto_norm, consulta.cargo, primer_tipo) == cascada_anterior(pregunta_norm)
+
+
+@pytest.mark.parametrize("pregunta, intencion", [
+    ("avance de obras en burdeos", 'avance_obra'),
+    ("residentes de burdeos", 'responsables'),
+    ("problematicas en burdeos", 'restricciones'),
+])
+def test_plurales_y_derivados(interpretar, pregunta, intencion):
+    consulta = interpretar(normalizar(pregunta))
+
+    assert (consulta.intencion, consulta.proyecto) == (intencion, "Burdeos")
+
+
+def test_proyecto_mas_largo_por_nombre(interpretar):
+    consulta = interpretar(normalizar("restricciones en peñon de alicante"))
+
+    assert consulta.proyecto == "Peñon de Alicante"
+
+
+def test_palabra_completa_antes_que_subcadena():
+    interpretar = construir_parser({"lorca": "Lorca", "lorcas del sur": "Lorcas del Sur", "sur": "Sur"})
+
+    assert interpretar("avance de obra en lorca sur").proyecto == "Lorca"
+    assert interpretar("avance de obra en lorcas del surco").proyecto == "Lorcas del Sur"
+
+
+def test_tipos_en_el_orden_del_mapeo(interpretar):
+    consulta = interpretar(normalizar("restricciones de permisos y restricciones de materiales"))
+
+    assert consulta.tipos_restriccion == ("Materiales", "Permisos y Licencias")
+
+
+def test_sin_vocabulario_no_hay_intencion(interpretar):
+    assert interpretar(normalizar("hola")) == (None, None, None, None, ())
+
+
+def tabla(filas):
+    return pd.DataFrame({'Proyecto': [f"Proyecto {i}" for i in range(filas)], 'Avance': np.arange(filas, dtype=float)})
+
+
+def test_tamano_de_respuestas():
+    grande, pequena = tabla(10000), tabla(10)
+
+    assert tamano_aproximado(("titulo", grande, None, 'general', None)) > grande.memory_usage(deep=True).sum()
+    assert tamano_aproximado(grande) > 100 * tamano_aproximado(pequena)
+
+
+def test_cache_acotada_por_bytes():
+    cache = CacheLRU(max_bytes=100, medir=len)
+    for clave in "abc":
+        cache.obtener_o_calcular(1, clave, lambda: "x" * 40)
+
+    # 'a' sale por LRU: tres valores de 40 no caben en 100 bytes
+    assert cache.estadisticas()['entradas'] == 2
+    assert cache.estadisticas()['bytes'] == 80
+    cache.obtener_o_calcular(1, "b", lambda: "no se recalcula")
+    cache.obtener_o_calcular(1, "d", lambda: "x" * 60)
+    assert cache.obtener_o_calcular(1, "b", lambda: "recalculado") == "x" * 40
+    assert cache.obtener_o_calcular(1, "c", lambda: "recalculado") == "recalculado"
+
+
+def test_cache_no_guarda_valores_mayores_que_la_cota():
+    cache = CacheLRU(max_bytes=100, medir=len)
+    cache.obtener_o_calcular(1, "a", lambda: "x" * 40)
+    cache.obtener_o_calcular(1, "enorme", lambda: "x" * 500)
+
+    assert cache.estadisticas()['entradas'] == 1
+    assert cache.obtener_o_calcular(1, "a", lambda: "recalculado") == "x" * 40
+
+
+def test_cache_se_vacia_con_otra_version():
+    cache = CacheLRU(max_bytes=100, medir=len)
+    cache.obtener_o_calcular(1, "a", lambda: "v1")
+
+    assert cache.obtener_o_calcular(2, "a", lambda: "v2") == "v2"
+    assert cache.estadisticas()['bytes'] == 2
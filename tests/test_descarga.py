@@ -0,0 +1,182 @@
+"""Revalidación del libro contra un servidor HTTP local (http.server) en lugar de GitHub."""
+import json
+import os
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datos import descargar_excel
+
+LIBRO_V1 = b"PK\x03\x04 libro v1"
+LIBRO_V2 = b"PK\x03\x04 libro v2"
+RESPALDO = b"PK\x03\x04 copia del repositorio"
+
+
+class Servidor:
+    """Sirve un único libro con ETag y guarda las cabeceras de cada petición"""
+
+    def __init__(self):
+        self.contenido = LIBRO_V1
+        self.etag = '"v1"'
+        self.peticiones = []
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.peticiones.append(dict(self.headers))
+                if self.headers.get("If-None-Match") == servidor.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", servidor.etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", servidor.etag)
+                self.send_header("Content-Length", str(len(servidor.contenido)))
+                self.end_headers()
+                self.wfile.write(servidor.contenido)
+
+            def log_message(self, *args):
+                pass
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self._http.server_port}/control_obra.xlsx"
+        self._hilo = threading.Thread(target=self._http.serve_forever, daemon=True)
+        self._hilo.start()
+
+    def cerrar(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+@pytest.fixture
+def servidor():
+    servidor = Servidor()
+    yield servidor
+    servidor.cerrar()
+
+
+@pytest.fixture
+def sesion():
+    # Sin los reintentos de obtener_sesion(): los errores de red deben verse al instante
+    with requests.Session() as sesion:
+        yield sesion
+
+
+@pytest.fixture
+def respaldo(tmp_path):
+    ruta = tmp_path / "respaldo.xlsx"
+    ruta.write_bytes(RESPALDO)
+    return str(ruta)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
+
+
+def url_sin_servidor():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        puerto = s.getsockname()[1]
+    return f"http://127.0.0.1:{puerto}/control_obra.xlsx"
+
+
+def descargar(url, cache_dir, respaldo, sesion):
+    return descargar_excel(url, cache_dir=cache_dir, respaldo=respaldo, sesion=sesion, timeout=(1, 2))
+
+
+def test_200_guarda_copia_y_validadores(servidor, cache_dir, respaldo, sesion):
+    contenido, origen = descargar(servidor.url, cache_dir, respaldo, sesion)
+
+    assert (contenido, origen) == (LIBRO_V1, 'red')
+    assert "If-None-Match" not in servidor.peticiones[0]
+    with open(os.path.join(cache_dir, "control_obra.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    assert meta['url'] == servidor.url
+    assert meta['etag'] == '"v1"'
+
+
+def test_304_reutiliza_la_copia(servidor, cache_dir, respaldo, sesion):
+    descargar(servidor.url, cache_dir, respaldo, sesion)
+    contenido, origen = descargar(servidor.url, cache_dir, respaldo, sesion)
+
+    assert (contenido, origen) == (LIBRO_V1, 'cache')
+    assert servidor.peticiones[1]["If-None-Match"] == '"v1"'
+
+
+def test_cambio_de_etag_descarga_la_version_nueva(servidor, cache_dir, respaldo, sesion):
+    descargar(servidor.url, cache_dir, respaldo, sesion)
+    servidor.contenido, servidor.etag = LIBRO_V2, '"v2"'
+
+    assert descargar(servidor.url, cache_dir, respaldo, sesion) == (LIBRO_V2, 'red')
+    assert descargar(servidor.url, cache_dir, respaldo, sesion) == (LIBRO_V2, 'cache')
+    assert servidor.peticiones[2]["If-None-Match"] == '"v2"'
+
+
+def test_error_de_red_usa_la_copia_guardada(servidor, cache_dir, respaldo, sesion):
+    descargar(servidor.url, cache_dir, respaldo, sesion)
+    servidor.cerrar()
+
+    assert descargar(servidor.url, cache_dir, respaldo, sesion) == (LIBRO_V1, 'copia')
+
+
+def test_error_de_red_no_usa_la_copia_de_otra_url(servidor, cache_dir, respaldo, sesion):
+    descargar(servidor.url, cache_dir, respaldo, sesion)
+
+    assert descargar(url_sin_servidor(), cache_dir, respaldo, sesion) == (RESPALDO, 'local')
+
+
+def test_error_de_red_sin_copia_usa_el_respaldo(cache_dir, respaldo, sesion):
+    assert descargar(url_sin_servidor(), cache_dir, respaldo, sesion) == (RESPALDO, 'local')
+
+
+def test_error_de_red_sin_copia_ni_respaldo_propaga_el_error(cache_dir, sesion):
+    with pytest.raises(requests.RequestException):
+        descargar(url_sin_servidor(), cache_dir, None, sesion)
+
+
+def test_copia_danada_se_descarga_de_nuevo(servidor, cache_dir, respaldo, sesion):
+    descargar(servidor.url, cache_dir, respaldo, sesion)
+    with open(os.path.join(cache_dir, "control_obra.xlsx"), "wb") as f:
+        f.write(b"<html>no es un libro</html>")
+
+    assert descargar(servidor.url, cache_dir, respaldo, sesion) == (LIBRO_V1, 'red')
+    assert "If-None-Match" not in servidor.peticiones[1]
+
+
+def test_copia_danada_sin_red_usa_el_respaldo(servidor, cache_dir, respaldo, sesion):
+    descargar(servidor.url, cache_dir, respaldo, sesion)
+    with open(os.path.join(cache_dir, "control_obra.xlsx"), "wb") as f:
+        f.write(b"")
+
+    assert descargar(url_sin_servidor(), cache_dir, respaldo, sesion) == (RESPALDO, 'local')
+
+
+def test_metadatos_danados_descargan_sin_validadores(servidor, cache_dir, respaldo, sesion):
+    descargar(servidor.url, cache_dir, respaldo, sesion)
+    with open(os.path.join(cache_dir, "control_obra.json"), "w", encoding="utf-8") as f:
+        f.write("{no es json")
+
+    assert descargar(servidor.url, cache_dir, respaldo, sesion) == (LIBRO_V1, 'red')
+    assert "If-None-Match" not in servidor.peticiones[1]
+
+
+def test_validadores_de_otra_url_no_se_envian(servidor, cache_dir, respaldo, sesion):
+    descargar(servidor.url, cache_dir, respaldo, sesion)
+    otra_url = servidor.url.replace("control_obra.xlsx", "otro.xlsx")
+
+    assert descargar(otra_url, cache_dir, respaldo, sesion) == (LIBRO_V1, 'red')
+    assert "If-None-Match" not in servidor.peticiones[1]
+
+
+def test_respuesta_que_no_es_xlsx_no_pisa_la_copia(servidor, cache_dir, respaldo, sesion):
+    descargar(servidor.url, cache_dir, respaldo, sesion)
+    servidor.contenido, servidor.etag = b"<html>error</html>", '"error"'
+
+    assert descargar(servidor.url, cache_dir, respaldo, sesion) == (LIBRO_V1, 'copia')
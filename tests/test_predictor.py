@@ -0,0 +1,60 @@
+"""El predictor compilado de una fila debe dar lo mismo que ``puntuar_lote``
+(get_dummies + ``scaler.transform`` + ``predict_proba``)."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from predictor import (
+    COLUMNAS_NUMERICAS, OPCIONES_CNC, OPCIONES_PRIORIDAD, OPCIONES_TIPO_CONTRATO,
+    codificar_lote, construir_predictor, puntuar_lote,
+)
+
+sklearn = pytest.importorskip("sklearn")
+from sklearn.neural_network import MLPClassifier  # noqa: E402
+from sklearn.preprocessing import MinMaxScaler, StandardScaler  # noqa: E402
+
+
+def lote_sintetico(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.DataFrame({
+        'dias_legalizacion_esperados': rng.integers(1, 60, n),
+        'numero_reprogramaciones': rng.integers(0, 8, n),
+        'prioridad': rng.choice(OPCIONES_PRIORIDAD, n),
+        'tipo_contrato': rng.choice(OPCIONES_TIPO_CONTRATO, n),
+        'CNCCompromiso': rng.choice(OPCIONES_CNC, n),
+    })
+
+
+def entrenar(scaler):
+    datos = lote_sintetico(400)
+    features = pd.get_dummies(datos).columns.tolist()
+    scaler.fit(datos[COLUMNAS_NUMERICAS].astype(float))
+    X = codificar_lote(datos, scaler, features)
+    y = (datos['dias_legalizacion_esperados'] < 30).astype(int)
+    modelo = MLPClassifier(hidden_layer_sizes=(8,), max_iter=300, random_state=0).fit(X, y)
+    return modelo, features
+
+
+@pytest.mark.filterwarnings("ignore::sklearn.exceptions.ConvergenceWarning")
+@pytest.mark.parametrize("scaler", [
+    StandardScaler(),
+    StandardScaler(with_mean=False),
+    StandardScaler(with_std=False),
+    StandardScaler(with_mean=False, with_std=False),
+    MinMaxScaler(),
+], ids=repr)
+def test_predictor_compilado_igual_que_el_lote(scaler):
+    modelo, features = entrenar(scaler)
+    predecir = construir_predictor(modelo, scaler, features)
+    contratos = lote_sintetico(25, semilla=1)
+    esperado = puntuar_lote(contratos, modelo, scaler, features)
+
+    for fila, (_, referencia) in zip(contratos.to_dict('records'), esperado.iterrows()):
+        prediccion, probabilidad = predecir(*fila.values())
+        assert probabilidad == pytest.approx(referencia['prob_cumplimiento'], abs=1e-9)
+        assert prediccion == referencia['prediccion']
@@ -0,0 +1,184 @@
+"""Envío de la bandeja de salida a una hoja falsa en memoria (sin red ni gspread)."""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registros import AlmacenRegistros, nuevo_registro
+from sincronizacion import COLUMNAS_HOJA, SincronizadorHoja
+
+
+class ErrorCuota(Exception):
+    """Imita gspread.exceptions.APIError con código 429"""
+    code = 429
+
+
+class HojaFalsa:
+    """Doble local de gspread.Worksheet con fallos programables en ``append_rows``.
+
+    ``errores_cuota`` llamadas fallan por cuota sin escribir nada; con
+    ``escribir_antes_de_fallar`` la siguiente llamada escribe esas filas del lote
+    y luego falla, como una respuesta perdida a mitad de camino; con
+    ``caer_tras_lotes`` la hoja deja de responder después de esos lotes.
+    """
+
+    def __init__(self, errores_cuota=0, escribir_antes_de_fallar=None, caer_tras_lotes=None):
+        self.filas = [list(COLUMNAS_HOJA)]
+        self.lotes = []
+        self.instantes = []
+        self.errores_cuota = errores_cuota
+        self.escribir_antes_de_fallar = escribir_antes_de_fallar
+        self.caer_tras_lotes = caer_tras_lotes
+
+    def append_rows(self, filas, value_input_option="RAW"):
+        self.instantes.append(time.monotonic())
+        if self.caer_tras_lotes is not None and len(self.lotes) >= self.caer_tras_lotes:
+            raise ConnectionError("sin conexión")
+        if self.errores_cuota:
+            self.errores_cuota -= 1
+            raise ErrorCuota("429 RESOURCE_EXHAUSTED: Quota exceeded")
+        if self.escribir_antes_de_fallar is not None:
+            self.filas.extend(filas[:self.escribir_antes_de_fallar])
+            self.escribir_antes_de_fallar = None
+            raise ConnectionError("conexión cortada a mitad del lote")
+        self.lotes.append(len(filas))
+        self.filas.extend(filas)
+
+    def col_values(self, columna):
+        return [fila[columna - 1] for fila in self.filas]
+
+    def ids(self):
+        return [fila[0] for fila in self.filas[1:]]
+
+
+class AlmacenQueCae(AlmacenRegistros):
+    """Almacén cuyo proceso 'muere' justo después del envío, antes de marcar el lote"""
+
+    def __init__(self, ruta):
+        super().__init__(ruta)
+        self.caido = threading.Event()
+
+    def marcar_sincronizados(self, ids):
+        self.caido.set()
+        raise RuntimeError("proceso detenido antes de marcar el lote")
+
+
+@pytest.fixture
+def ruta_bd(tmp_path):
+    return str(tmp_path / "registros.sqlite3")
+
+
+def guardar(almacen, n):
+    almacen.insertar_lote([
+        nuevo_registro('novedad', {'proyecto': f"Proyecto {i % 7}", 'urgencia': "Alta", 'descripcion': f"n{i}"})
+        for i in range(n)
+    ])
+
+
+def sincronizar(almacen, hoja, **parametros):
+    parametros = {'max_lote': 500, 'intervalo': 0.05, 'espera_base': 0.01, 'espera_max': 0.05, **parametros}
+    return SincronizadorHoja(almacen, lambda: hoja, **parametros)
+
+
+def esperar(condicion, limite=10.0):
+    fin = time.monotonic() + limite
+    while not condicion():
+        assert time.monotonic() < fin, "tiempo de espera agotado"
+        time.sleep(0.01)
+
+
+def esperar_vacio(almacen):
+    esperar(lambda: almacen.contar_pendientes() == 0)
+
+
+def todos_los_ids(almacen):
+    return sorted(str(id_) for id_ in almacen.listar(limite=10000)['id'])
+
+
+def test_envia_en_lotes_de_500(ruta_bd):
+    almacen = AlmacenRegistros(ruta_bd)
+    guardar(almacen, 1200)
+    hoja = HojaFalsa()
+
+    sincronizador = sincronizar(almacen, hoja)
+    esperar_vacio(almacen)
+    sincronizador.detener()
+
+    assert hoja.lotes == [500, 500, 200]
+    assert sorted(hoja.ids()) == todos_los_ids(almacen)
+    assert sincronizador.estadisticas()['enviados'] == 1200
+
+
+def test_cuota_agotada_espera_de_forma_exponencial(ruta_bd):
+    almacen = AlmacenRegistros(ruta_bd)
+    guardar(almacen, 10)
+    hoja = HojaFalsa(errores_cuota=3)
+
+    sincronizador = sincronizar(almacen, hoja, espera_base=0.1, espera_max=1.0)
+    esperar_vacio(almacen)
+    sincronizador.detener()
+
+    pausas = [b - a for a, b in zip(hoja.instantes, hoja.instantes[1:])]
+    # espera_base · 2^n con jitter entre la mitad y el total
+    for n, pausa in enumerate(pausas):
+        assert pausa >= 0.1 * 2 ** n * 0.5 - 0.01
+    assert len(pausas) == 3
+    assert hoja.lotes == [10]
+    assert sincronizador.estadisticas()['errores_cuota'] == 3
+
+
+def test_fallo_a_mitad_de_lote_no_duplica_filas(ruta_bd):
+    almacen = AlmacenRegistros(ruta_bd)
+    guardar(almacen, 800)
+    hoja = HojaFalsa(escribir_antes_de_fallar=230)
+
+    sincronizador = sincronizar(almacen, hoja)
+    esperar_vacio(almacen)
+    sincronizador.detener()
+
+    assert len(hoja.ids()) == len(set(hoja.ids())) == 800
+    assert sorted(hoja.ids()) == todos_los_ids(almacen)
+
+
+def test_reinicio_retoma_lo_pendiente(ruta_bd):
+    almacen = AlmacenRegistros(ruta_bd)
+    guardar(almacen, 1200)
+    # Primera ejecución: el primer lote llega y la hoja deja de responder
+    hoja = HojaFalsa(caer_tras_lotes=1)
+    sincronizador = sincronizar(almacen, hoja)
+    esperar(lambda: len(hoja.instantes) > 1)
+    sincronizador.detener()
+    assert almacen.contar_pendientes() == 700
+
+    hoja.caer_tras_lotes = None
+    almacen = AlmacenRegistros(ruta_bd)
+    sincronizador = sincronizar(almacen, hoja)
+    esperar_vacio(almacen)
+    sincronizador.detener()
+
+    assert hoja.lotes == [500, 500, 200]
+    assert sorted(hoja.ids()) == todos_los_ids(almacen)
+
+
+def test_reinicio_tras_enviar_sin_marcar_no_duplica(ruta_bd):
+    almacen = AlmacenQueCae(ruta_bd)
+    guardar(almacen, 600)
+    hoja = HojaFalsa()
+
+    sincronizador = sincronizar(almacen, hoja, espera_max=10.0)
+    assert almacen.caido.wait(10)
+    sincronizador.detener()
+    assert hoja.lotes == [500]
+
+    almacen = AlmacenRegistros(ruta_bd)
+    assert almacen.contar_pendientes() == 600
+    sincronizador = sincronizar(almacen, hoja)
+    esperar_vacio(almacen)
+    sincronizador.detener()
+
+    assert hoja.lotes == [500, 100]
+    assert len(hoja.ids()) == len(set(hoja.ids())) == 600
@@ -0,0 +1,106 @@
+"""Consultas por voz: audio del navegador o de un clip WAV transcrito con Whisper
+en CPU y sin red (sin dependencias de Streamlit).
+
+El modelo se carga una sola vez por proceso, en el primer uso, y las
+transcripciones pasan por un grupo acotado de hilos para no saturar la CPU.
+"""
+import importlib.util
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from math import gcd
+
+import numpy as np
+
+WHISPER_AVAILABLE = importlib.util.find_spec("whisper") is not None
+
+FRECUENCIA_WHISPER = 16000
+MODELO_WHISPER = os.environ.get("MAR_WHISPER_MODELO", "base")
+# Carpeta con los pesos ya descargados (<modelo>.pt); nunca se descargan desde la app
+DIR_MODELOS_WHISPER = os.environ.get(
+    "MAR_WHISPER_DIR", os.path.join(os.path.expanduser("~"), ".cache", "whisper")
+)
+IDIOMA = "es"
+
+
+def leer_wav(contenido):
+    """Decodifica un WAV en memoria; devuelve (señal float32 mono en [-1, 1], frecuencia)"""
+    from scipy.io import wavfile
+
+    frecuencia, datos = wavfile.read(io.BytesIO(contenido))
+    if np.issubdtype(datos.dtype, np.integer):
+        info = np.iinfo(datos.dtype)
+        # PCM de 8 bits es sin signo; el resto, con signo
+        datos = (datos.astype(np.float32) - (info.max + info.min + 1) / 2) / ((info.max - info.min + 1) / 2)
+    if datos.ndim > 1:
+        datos = datos.mean(axis=1)
+    return datos.astype(np.float32, copy=False), frecuencia
+
+
+def remuestrear(senal, frecuencia, destino=FRECUENCIA_WHISPER):
+    """Remuestreo polifásico (filtro antialiasing incluido) a la frecuencia de Whisper"""
+    if frecuencia == destino:
+        return senal
+    from scipy.signal import resample_poly
+
+    divisor = gcd(frecuencia, destino)
+    return resample_poly(senal, destino // divisor, frecuencia // divisor).astype(np.float32, copy=False)
+
+
+def preparar_audio(contenido):
+    """WAV en bytes -> señal mono float32 a 16 kHz, lista para ``transcribe``"""
+    senal, frecuencia = leer_wav(contenido)
+    return remuestrear(senal, frecuencia)
+
+
+def ruta_modelo(nombre=MODELO_WHISPER, carpeta=DIR_MODELOS_WHISPER):
+    """Ruta local de los pesos, o None si no están descargados o whisper no está instalado"""
+    ruta = os.path.join(carpeta, f"{nombre}.pt")
+    return ruta if WHISPER_AVAILABLE and os.path.exists(ruta) else None
+
+
+class TranscriptorVoz:
+    """Modelo Whisper compartido y grupo acotado de transcripciones.
+
+    ``enviar`` devuelve un Future con el texto, o None si ya hay
+    ``max_pendientes`` audios en curso (la app pide reintentar en lugar de
+    acumular trabajo). Con un solo trabajador el modelo nunca se usa desde dos
+    hilos a la vez.
+    """
+
+    def __init__(self, ruta, max_trabajadores=1, max_pendientes=4):
+        self.ruta = ruta
+        self._modelo = None
+        self._lock_modelo = threading.Lock()
+        self._ejecutor = ThreadPoolExecutor(max_workers=max_trabajadores, thread_name_prefix="whisper")
+        self._cupos = threading.BoundedSemaphore(max_pendientes)
+
+    def modelo(self):
+        with self._lock_modelo:
+            if self._modelo is None:
+                import whisper
+
+                self._modelo = whisper.load_model(self.ruta, device="cpu")
+            return self._modelo
+
+    def transcribir(self, senal):
+        resultado = self.modelo().transcribe(
+            senal, language=IDIOMA, task="transcribe", fp16=False, condition_on_previous_text=False
+        )
+        return resultado["text"].strip()
+
+    def _trabajo(self, contenido):
+        try:
+            return self.transcribir(preparar_audio(contenido))
+        finally:
+            self._cupos.release()
+
+    def enviar(self, contenido):
+        if not self._cupos.acquire(blocking=False):
+            return None
+        try:
+            return self._ejecutor.submit(self._trabajo, contenido)
+        except Exception:
+            self._cupos.release()
+            raise